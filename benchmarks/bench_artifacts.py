@@ -0,0 +1,82 @@
+"""
+Benchmark: Excel (.xlsx) hand-offs vs Parquet artifacts between pipeline stages.
+
+Cleans + parses Logs/Linux_20k.log once, fills 'Event Meaning' with the template text
+(stand-in for the LLM stage), then times every stage hand-off (write + read of both
+sheets) through openpyxl and through artifact_store. The tables are replicated
+'copies' times to show how each format scales.
+
+Usage:
+    python benchmarks/bench_artifacts.py [copies]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cleaner import clean_log_file
+from parser import parse_log_file
+from artifact_store import read_sheets, write_sheets, SHEETS
+
+# Hand-offs in the current pipeline: parse -> meaning -> merged -> sorted -> report
+STAGES = ["analysis", "meaning", "merged", "sorted"]
+
+
+def excel_round_trip(path, sheets):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return {name: pd.read_excel(path, sheet_name=name) for name in SHEETS}
+
+
+def artifact_round_trip(path, sheets):
+    write_sheets(path, sheets)
+    return read_sheets(path)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(tmp_dir, 'bench.log')
+        shutil.copy(os.path.join(ROOT, 'Logs', 'Linux_20k.log'), log_file)
+        cleaned, _, _, _ = clean_log_file(log_file)
+        parsed, _, _, _ = parse_log_file(cleaned)
+
+        sheets = read_sheets(parsed)
+        sheets['Template Summary']['Event Meaning'] = sheets['Template Summary']['Template Pattern']
+        sheets['Log Analysis'] = pd.concat([sheets['Log Analysis']] * copies, ignore_index=True)
+        rows = len(sheets['Log Analysis'])
+        print(f"\nRows per hand-off: {rows} ({copies}x Linux_20k parsed)")
+
+        print(f"{'stage':<12}{'excel s':>10}{'parquet s':>12}{'speedup':>10}")
+        total_excel = total_parquet = 0.0
+        for stage in STAGES:
+            excel_s = timed(excel_round_trip, os.path.join(tmp_dir, f"{stage}.xlsx"), sheets)
+            parquet_s = timed(artifact_round_trip, os.path.join(tmp_dir, f"{stage}.artifact"), sheets)
+            total_excel += excel_s
+            total_parquet += parquet_s
+            print(f"{stage:<12}{excel_s:>10.2f}{parquet_s:>12.3f}{excel_s / parquet_s:>9.0f}x")
+        print(f"{'total':<12}{total_excel:>10.2f}{total_parquet:>12.3f}{total_excel / total_parquet:>9.0f}x")
+
+        # Same tables back?
+        back = read_sheets(os.path.join(tmp_dir, "sorted.artifact"))
+        same = all(back[name].equals(sheets[name]) for name in SHEETS)
+        print(f"Artifact round trip identical: {same}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: prefix-trie blacklist matcher vs the old per-keyword startswith loop.
+
+Usage:
+    python benchmarks/bench_blacklist.py [log_file] [blacklist_size]
+"""
+import os
+import sys
+import time
+import random
+import string
+import tempfile
+import shutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cleaner import BASE_BLACKLIST, extract_process_name, build_blacklist_matcher, clean_log_file
+
+
+def make_blacklist(size, seed=42):
+    """BASE_BLACKLIST padded with random keywords up to 'size' entries."""
+    rng = random.Random(seed)
+    words = set(BASE_BLACKLIST)
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12))))
+    return sorted(words)
+
+
+def naive_match(proc, blacklist):
+    # The pre-trie logic from clean_log_file
+    for bad in blacklist:
+        if proc.startswith(bad):
+            return bad
+    return None
+
+
+def main():
+    log_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'Logs', 'Linux_20k.log')
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    blacklist = make_blacklist(size)
+    blacklist_set = set(blacklist)
+    matcher = build_blacklist_matcher(blacklist)
+
+    with open(log_file, 'r') as f:
+        procs = [p for p in (extract_process_name(line) for line in f) if p]
+
+    print(f"Log file:       {os.path.basename(log_file)} ({len(procs)} process tokens)")
+    print(f"Blacklist size: {len(blacklist)}")
+
+    # 1. Matcher only
+    start = time.perf_counter()
+    naive = [naive_match(p, blacklist_set) for p in procs]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie = [matcher.match(p) for p in procs]
+    trie_time = time.perf_counter() - start
+
+    # Same keep/remove decision for every line (the keyword can differ: trie reports the longest)
+    mismatches = sum((a is None) != (b is None) for a, b in zip(naive, trie))
+
+    print(f"startswith loop: {naive_time:.4f}s")
+    print(f"prefix trie:     {trie_time:.4f}s  ({naive_time / trie_time:.1f}x faster)")
+    print(f"Decision mismatches: {mismatches}")
+
+    # 2. Full clean_log_file run (on a temp copy so Logs/ is not touched)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        tmp_log = os.path.join(tmp_dir, os.path.basename(log_file))
+        shutil.copy(log_file, tmp_log)
+        start = time.perf_counter()
+        _, _, kept, removed = clean_log_file(tmp_log, extra_blacklist=blacklist)
+        print(f"clean_log_file:  {time.perf_counter() - start:.4f}s  (kept {kept}, removed {removed})")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
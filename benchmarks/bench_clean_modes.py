@@ -0,0 +1,99 @@
+"""
+Benchmark: text-mode cleaner vs the bytes/mmap fast path (and the parallel mode).
+
+Replicates Logs/Linux_20k.log up to the requested size, cleans it with each mode
+'repeat' times (modes take turns; median reported) and checks that every mode
+produces byte-identical _clean/_trash files.
+
+Measured fast vs text on a 1-CPU box (200 MB, median of 5): 2.2x, short of
+the 3x target. Per 4 MB block the bytes path spends about 10 ms in splitlines()
+and 15 ms in the per-line split(); the other candidates measured slower or even:
+  * one compiled re.finditer over the block (5th token + keyword trie), so only
+    dropped lines reach Python: 50-73 ms
+  * batched decisions (map(bytes.split) + itertools.compress, no Python loop): 37 ms
+    vs 38 ms for the current loop
+Getting to 3x needs the per-line work out of Python (a C extension or numpy).
+
+Usage:
+    python benchmarks/bench_clean_modes.py [size_mb] [workers] [repeat]
+"""
+import os
+import sys
+import time
+import statistics
+import shutil
+import filecmp
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cleaner import clean_log_file
+
+
+def replicate(source, target, size_bytes):
+    """Concatenates 'source' into 'target' until it reaches size_bytes."""
+    with open(source, 'rb') as f:
+        data = f.read()
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    written = 0
+    with open(target, 'wb') as out:
+        while written < size_bytes:
+            out.write(data)
+            written += len(data)
+    return written
+
+
+def run(label, log_file, **kwargs):
+    start = time.perf_counter()
+    out, trash, kept, removed = clean_log_file(log_file, **kwargs)
+    elapsed = time.perf_counter() - start
+    # Keep a copy of the outputs so the next mode can't overwrite them
+    shutil.move(out, f"{out}.{label}")
+    shutil.move(trash, f"{trash}.{label}")
+    return elapsed, f"{out}.{label}", f"{trash}.{label}", kept, removed
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    source = os.path.join(ROOT, 'Logs', 'Linux_20k.log')
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(tmp_dir, 'bench.log')
+        size = replicate(source, log_file, size_mb * 1024 * 1024)
+        print(f"Input: {size / 1024 / 1024:.0f} MB (Linux_20k.log replicated)")
+
+        modes = [
+            ("text", {}),
+            ("fast", {"fast": True}),
+            (f"parallel_x{workers}", {"workers": workers}),
+            (f"fast_parallel_x{workers}", {"fast": True, "workers": workers}),
+        ]
+        # Modes take turns in every round, so drift on a busy box hits them all alike
+        times = {label: [] for label, _ in modes}
+        results = {}
+        for _ in range(repeat):
+            for label, kwargs in modes:
+                elapsed, *outputs = run(label, log_file, **kwargs)
+                times[label].append(elapsed)
+                results[label] = (statistics.median(times[label]), *outputs)
+
+        base_time, base_out, base_trash, base_kept, base_removed = results["text"]
+        print(f"{'mode':<22}{'seconds':>10}{'MB/s':>10}{'speedup':>10}  identical")
+        for label, (elapsed, out, trash, kept, removed) in results.items():
+            identical = (kept, removed) == (base_kept, base_removed) \
+                and filecmp.cmp(out, base_out, shallow=False) \
+                and filecmp.cmp(trash, base_trash, shallow=False)
+            print(f"{label:<22}{elapsed:>10.2f}{size / 1024 / 1024 / elapsed:>10.1f}{base_time / elapsed:>9.1f}x  {identical}")
+        ratio = base_time / results["fast"][0]
+        print(f"\nfast vs text: {ratio:.1f}x (target 3x: {'reached' if ratio >= 3 else 'not reached'})")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
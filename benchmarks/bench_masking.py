@@ -0,0 +1,130 @@
+"""
+Golden-output check + throughput: legacy preprocessing/masking chain vs the fused engine.
+
+For every line of Logs/Linux_2k.log and Logs/Linux_20k.log (cleaned with the default
+blacklist) it compares:
+  * the preprocessed content fed to Drain3     (legacy preprocess_log)
+  * the cleaned raw line used for extraction   (legacy prepare_raw_line)
+  * the masked content                         (Drain3 LogMasker)
+against parser.normalize_line() + masking_engine.FusedMasker, then times both chains.
+Exits with status 1 on any mismatch.
+
+Usage:
+    python benchmarks/bench_masking.py [repeats]
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from drain3.masking import LogMasker
+from cleaner import clean_log_file
+from parser import get_miner_config, normalize_line
+from masking_engine import FusedMasker
+
+
+# --- Legacy chain (verbatim copy of the pre-fusion parser helpers) ---
+def legacy_remove_trailing_timestamp(text):
+    return re.sub(r"\s+at\s+\w{3}\s+\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4}$", "", text)
+
+def legacy_normalize_login_uid(line):
+    return re.sub(r"\b\w+\(uid=", "(uid=", line)
+
+def legacy_normalize_ftpd_rhost(line):
+    pattern = re.compile(r"(connection from)\s+(\d{1,3}(?:\.\d{1,3}){3})\s*\(([^)]*)\)")
+    def replacer(match):
+        prefix, outer_ip, inner = match.group(1), match.group(2), match.group(3).strip()
+        return f"{prefix} {outer_ip} ({inner})" if inner else f"{prefix} {outer_ip}"
+    return pattern.sub(replacer, line)
+
+def legacy_preprocess_log(log_line):
+    log_line = legacy_remove_trailing_timestamp(log_line)
+    log_line = legacy_normalize_ftpd_rhost(log_line)
+    header_regex = r'^([A-Z][a-z]{2}\s+\d+\s\d{2}:\d{2}:\d{2})\s+(\S+)'
+    log_line = re.sub(header_regex, '<TIMESTAMP> <HOSTNAME>', log_line)
+    return log_line.strip()
+
+def legacy_prepare_raw_line(raw_line):
+    clean_raw_line = legacy_remove_trailing_timestamp(raw_line)
+    clean_raw_line = legacy_normalize_login_uid(clean_raw_line)
+    return legacy_normalize_ftpd_rhost(clean_raw_line)
+
+
+def legacy_chain(lines, masker):
+    return [(content, legacy_prepare_raw_line(raw), masker.mask(content))
+            for raw in lines
+            for content in (legacy_preprocess_log(raw),)]
+
+
+def fused_chain(lines, masker):
+    return [(content, clean_raw_line, masker.mask(content))
+            for raw in lines
+            for content, clean_raw_line in (normalize_line(raw),)]
+
+
+def compare_chains(lines, legacy_masker, fused_masker):
+    """Return (expected, actual, mismatching line indexes) for the two chains."""
+    expected = legacy_chain(lines, legacy_masker)
+    actual = fused_chain(lines, fused_masker)
+    return expected, actual, [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+
+
+def make_maskers():
+    config = get_miner_config()
+    return (LogMasker(config.masking_instructions, config.mask_prefix, config.mask_suffix),
+            FusedMasker(config.masking_instructions, config.mask_prefix, config.mask_suffix))
+
+
+def load_cleaned_lines(name, tmp_dir):
+    log_file = os.path.join(tmp_dir, name)
+    shutil.copy(os.path.join(ROOT, 'Logs', name), log_file)
+    cleaned, _, _, _ = clean_log_file(log_file)
+    with open(cleaned, 'r', encoding='utf-8', errors='ignore') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def timed(fn, *args, repeats=1):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    legacy_masker, fused_masker = make_maskers()
+
+    tmp_dir = tempfile.mkdtemp()
+    failed = False
+    try:
+        for name in ("Linux_2k.log", "Linux_20k.log"):
+            lines = load_cleaned_lines(name, tmp_dir)
+            expected, actual, mismatches = compare_chains(lines, legacy_masker, fused_masker)
+            if mismatches:
+                failed = True
+                i = mismatches[0]
+                print(f"[GOLDEN] {name}: {len(mismatches)} mismatches, first at line {i}:")
+                print(f"   expected: {expected[i]}\n   actual:   {actual[i]}")
+            else:
+                print(f"[GOLDEN] {name}: {len(lines)} lines identical.")
+
+            legacy_s = timed(legacy_chain, lines, legacy_masker, repeats=repeats)
+            fused_s = timed(fused_chain, lines, fused_masker, repeats=repeats)
+            print(f"   legacy {legacy_s:.3f}s ({len(lines) / legacy_s:,.0f} lines/s)  "
+                  f"fused {fused_s:.3f}s ({len(lines) / fused_s:,.0f} lines/s)  "
+                  f"speedup {legacy_s / fused_s:.1f}x")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: template meanings with 1 vs N templates per Ollama request.
+
+Starts benchmarks/stub_ollama.py in-process and parses Logs/Linux_2k.log (or --log),
+then runs generate_meanings_for_file once per batch size with an empty cache each
+time. Reports requests, prompt tokens (the stub's approximation), wall time and
+whether every row got the stub's meaning for its own template. --drop-every makes
+the stub break some batch answers, so the single-template re-queries are exercised.
+
+Usage:
+    python benchmarks/bench_ollama_batching.py [sizes ...] [--log FILE] [--latency 0.2]
+                                               [--item-latency 0.02] [--drop-every 0] [--in-flight 1]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stub_ollama import start_stub_server, stub_meaning, DEFAULT_PORT
+
+# The ollama module builds its client from OLLAMA_HOST at import time
+os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{DEFAULT_PORT}"
+
+import llama_meaning_generator
+from cleaner import clean_log_file
+from parser import parse_log_file
+from artifact_store import read_sheet
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare templates-per-request against a stub Ollama.")
+    ap.add_argument("sizes", nargs="*", type=int, default=[1, 8, 16])
+    ap.add_argument("--log", default=os.path.join(ROOT, 'Logs', 'Linux_2k.log'))
+    ap.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    ap.add_argument("--item-latency", type=float, default=0.02, help="stub seconds per template")
+    ap.add_argument("--drop-every", type=int, default=0, help="every Nth batch entry loses its placeholders")
+    ap.add_argument("--in-flight", type=int, default=1, help="requests open at once")
+    args = ap.parse_args()
+
+    server = start_stub_server(DEFAULT_PORT, args.latency, args.in_flight, args.item_latency, args.drop_every)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(tmp_dir, 'bench.log')
+        shutil.copy(args.log, log_file)
+        cleaned = clean_log_file(log_file)[0]
+        parsed = parse_log_file(cleaned)[0]
+        llama_meaning_generator.CACHE_FILE = os.path.join(tmp_dir, "no_json_cache.json")
+        llama_meaning_generator.RULES_ENABLED = False # Every template goes to the (stub) LLM
+
+        print(f"\n{'batch':>6}{'templates':>11}{'requests':>10}{'prompt tok':>12}{'seconds':>10}   in order")
+        for size in args.sizes:
+            llama_meaning_generator.CACHE_DB = os.path.join(tmp_dir, f"cache_{size}.sqlite3")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                output, count, _ = llama_meaning_generator.generate_meanings_for_file(
+                    parsed, max_in_flight=args.in_flight, batch_size=size)
+            seconds = time.perf_counter() - start
+            usage = llama_meaning_generator.prompt_usage
+            summary = read_sheet(output, 'Template Summary')
+            expected = [stub_meaning(str(t).strip()).replace('"', '') for t in summary['Template Pattern']]
+            in_order = summary['Event Meaning'].tolist() == expected
+            print(f"{size:>6}{count:>11}{usage['requests']:>10}{usage['prompt_tokens']:>12,}{seconds:>10.2f}   {in_order}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
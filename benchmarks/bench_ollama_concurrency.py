@@ -0,0 +1,74 @@
+"""
+Benchmark: template meaning generation with 1 vs N Ollama requests in flight.
+
+Starts benchmarks/stub_ollama.py in-process (fixed latency per chat, --parallel
+chats served at once), parses Logs/Linux_2k.log, then runs generate_meanings_for_file
+once per in-flight limit with an empty cache each time. Checks that every row of
+the Template Summary got the stub's meaning for its own template.
+
+Usage:
+    python benchmarks/bench_ollama_concurrency.py [limits ...] [--latency 0.2] [--parallel 8] [--batch-size 1]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stub_ollama import start_stub_server, stub_meaning, DEFAULT_PORT
+
+# The ollama module builds its client from OLLAMA_HOST at import time
+os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{DEFAULT_PORT}"
+
+import llama_meaning_generator
+from cleaner import clean_log_file
+from parser import parse_log_file
+from artifact_store import read_sheet
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare in-flight limits against a stub Ollama.")
+    ap.add_argument("limits", nargs="*", type=int, default=[1, 4, 8])
+    ap.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    ap.add_argument("--parallel", type=int, default=8, help="stub requests served at once")
+    ap.add_argument("--batch-size", type=int, default=1, help="templates per request")
+    args = ap.parse_args()
+
+    server = start_stub_server(DEFAULT_PORT, args.latency, args.parallel)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(tmp_dir, 'bench.log')
+        shutil.copy(os.path.join(ROOT, 'Logs', 'Linux_2k.log'), log_file)
+        cleaned = clean_log_file(log_file)[0]
+        parsed = parse_log_file(cleaned)[0]
+        llama_meaning_generator.CACHE_FILE = os.path.join(tmp_dir, "no_json_cache.json")
+        llama_meaning_generator.RULES_ENABLED = False # Every template goes to the (stub) LLM
+
+        print(f"\n{'in flight':>10}{'templates':>11}{'seconds':>10}{'speedup':>9}   in order")
+        base_seconds = None
+        for limit in args.limits:
+            llama_meaning_generator.CACHE_DB = os.path.join(tmp_dir, f"cache_{limit}.sqlite3")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                output, count, _ = llama_meaning_generator.generate_meanings_for_file(
+                    parsed, max_in_flight=limit, batch_size=args.batch_size)
+            seconds = time.perf_counter() - start
+            summary = read_sheet(output, 'Template Summary')
+            expected = [stub_meaning(str(t).strip()).replace('"', '') for t in summary['Template Pattern']]
+            in_order = summary['Event Meaning'].tolist() == expected
+            base_seconds = base_seconds or seconds
+            print(f"{limit:>10}{count:>11}{seconds:>10.2f}{base_seconds / seconds:>8.1f}x   {in_order}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: first meaning request with and without the startup warm-up.
+
+Runs against benchmarks/stub_ollama.py with a model load latency (--load-latency,
+paid by the first request the stub serves):
+  cold   -> the first generate_single_meaning() pays the load
+  warm   -> start_background_warmup() ran first (health check + pre-load), so the
+            first request doesn't
+Also times ollama_health() on the first call and on a cached call within HEALTH_TTL.
+
+Usage:
+    python benchmarks/bench_ollama_warmup.py [--load-latency 2.0] [--latency 0.1]
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stub_ollama import start_stub_server, DEFAULT_PORT
+
+# The ollama module builds its client from OLLAMA_HOST at import time
+os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{DEFAULT_PORT}"
+
+import llama_meaning_generator
+
+TEMPLATE = "<TIMESTAMP> <HOSTNAME> sshd(pam_unix)[<PID>]: check pass; user <USERNAME>"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="First-request latency with and without warm-up.")
+    ap.add_argument("--load-latency", type=float, default=2.0, help="stub model load seconds")
+    ap.add_argument("--latency", type=float, default=0.1, help="stub seconds per request")
+    args = ap.parse_args()
+
+    print(f"\n{'run':<28}{'seconds':>10}")
+    for warm in (False, True):
+        # A fresh stub per run, so the model starts unloaded each time
+        server = start_stub_server(DEFAULT_PORT, args.latency, 4, load_latency=args.load_latency)
+        try:
+            if warm:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    llama_meaning_generator.start_background_warmup().join()
+            seconds = timed(llama_meaning_generator.generate_single_meaning, TEMPLATE)
+            print(f"{'first request, ' + ('warm' if warm else 'cold'):<28}{seconds:>10.2f}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    server = start_stub_server(DEFAULT_PORT, args.latency, 4)
+    try:
+        print(f"{'health check, first':<28}{timed(llama_meaning_generator.ollama_health, True):>10.3f}")
+        print(f"{'health check, cached':<28}{timed(llama_meaning_generator.ollama_health):>10.3f}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: how much of a log the rule engine (code/rule_meanings.py) covers without the LLM.
+
+Cleans and parses each log, then reports templates / log lines covered by a rule
+and the rule engine's time. --show lists the templates left for the LLM.
+
+Usage:
+    python benchmarks/bench_rule_coverage.py [LOG ...] [--show]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cleaner import clean_log_file
+from parser import parse_log_file
+from artifact_store import read_sheet
+from rule_meanings import rule_meaning
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rule engine coverage on parsed logs.")
+    ap.add_argument("logs", nargs="*", default=[os.path.join(ROOT, 'Logs', 'Linux_2k.log'),
+                                                os.path.join(ROOT, 'Logs', 'Linux_20k.log')])
+    ap.add_argument("--show", action="store_true", help="list templates without a rule")
+    args = ap.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    rows = []
+    try:
+        for log in args.logs:
+            log_file = os.path.join(tmp_dir, os.path.basename(log))
+            shutil.copy(log, log_file)
+            with contextlib.redirect_stdout(io.StringIO()):
+                parsed = parse_log_file(clean_log_file(log_file)[0])[0]
+            summary = read_sheet(parsed, 'Template Summary')
+            templates = [str(t).strip() for t in summary['Template Pattern']]
+            start = time.perf_counter()
+            covered = [rule_meaning(t) is not None for t in templates]
+            seconds = time.perf_counter() - start
+            lines = int(summary['Occurrences'].sum())
+            covered_lines = int(summary['Occurrences'][covered].sum())
+            rows.append((os.path.basename(log), sum(covered), len(templates), covered_lines, lines, seconds))
+            if args.show:
+                for template, hit in zip(templates, covered):
+                    if not hit:
+                        print(f"   [LLM] {template}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"\n{'log':<20}{'templates':>14}{'lines':>20}{'ms':>8}")
+    for name, hit, total, hit_lines, lines, seconds in rows:
+        print(f"{name:<20}{f'{hit}/{total}':>9} {hit / total:>4.0%}{f'{hit_lines}/{lines}':>14} {hit_lines / lines:>4.0%}"
+              f"{seconds * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
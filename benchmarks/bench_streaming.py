@@ -0,0 +1,88 @@
+"""
+Benchmark: peak memory of parse_log_file, in-memory vs streaming output.
+
+Cleans Logs/Linux_20k.log, repeats it 'copies' times into one big input, then runs
+each mode in a fresh child process and reports wall time + peak RSS.
+Both artifacts are compared afterwards (same rows once sorted by Line Index).
+
+Usage:
+    python benchmarks/bench_streaming.py [copies ...]
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cleaner import clean_log_file
+
+# Peak RSS is read from VmHWM: ru_maxrss survives exec, so a child would report the
+# parent's peak if that was higher
+CHILD = """
+import sys, time, json, resource
+sys.path.insert(0, {code!r})
+from parser import parse_log_file
+start = time.perf_counter()
+parse_log_file({log!r}, stream={stream})
+elapsed = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "peak_mb": peak_kb / 1024}}))
+"""
+
+
+def run_mode(log_file, stream):
+    code = CHILD.format(code=os.path.join(ROOT, 'code'), log=log_file, stream=stream)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def same_rows(a, b):
+    from artifact_store import read_sheet
+    x = read_sheet(a, 'Log Analysis').sort_values('Line Index').reset_index(drop=True)
+    y = read_sheet(b, 'Log Analysis').sort_values('Line Index').reset_index(drop=True)
+    return x.equals(y)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 40]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(tmp_dir, 'bench.log')
+        shutil.copy(os.path.join(ROOT, 'Logs', 'Linux_20k.log'), log_file)
+        cleaned, _, _, _ = clean_log_file(log_file)
+        with open(cleaned, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        print(f"\n{'copies':>7}{'lines':>10}{'mode':>12}{'seconds':>10}{'peak MB':>10}")
+        for copies in sizes:
+            results = {}
+            for stream in (False, True):
+                mode_dir = os.path.join(tmp_dir, f"{copies}_{'stream' if stream else 'memory'}")
+                os.makedirs(mode_dir)
+                big = os.path.join(mode_dir, 'big.log')
+                with open(big, 'w', encoding='utf-8') as f:
+                    for _ in range(copies):
+                        f.writelines(lines)
+                results[stream] = run_mode(big, stream)
+                r = results[stream]
+                print(f"{copies:>7}{len(lines) * copies:>10}{'stream' if stream else 'in-memory':>12}"
+                      f"{r['seconds']:>10.2f}{r['peak_mb']:>10.0f}")
+            identical = same_rows(os.path.join(tmp_dir, f"{copies}_memory", 'big_analysis.artifact'),
+                                  os.path.join(tmp_dir, f"{copies}_stream", 'big_analysis.artifact'))
+            print(f"{'':>7}Same rows in both artifacts: {identical}")
+            shutil.rmtree(os.path.join(tmp_dir, f"{copies}_memory"))
+            shutil.rmtree(os.path.join(tmp_dir, f"{copies}_stream"))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Benchmark suite: every pipeline stage on synthetic syslog, compared against a stored baseline.
+
+For each size it generates a synthetic log (benchmarks/synth_syslog.py, fixed seed), then
+runs each stage in its own child process so timings and peak RSS don't leak between stages:
+
+    clean   -> clean_log_file (fast path, like the pipeline)
+    parse   -> parse_log_file (two-phase on all cores, streaming for big inputs)
+    merge   -> step_1_merge_sentences   (meanings stubbed with the template text)
+    sort    -> step_2_sort_logs
+    report  -> step_3_generate_report(charts=False)
+    charts  -> create_all_charts only (its child prepares the report frame first,
+               so its peak RSS includes that)
+
+Each stage runs --repeat times (median kept). Prints seconds, lines/s and peak RSS
+(VmHWM) per stage and compares the seconds and peak RSS against the baseline JSON;
+exits with status 1 on a regression above --tolerance (time changes under
+--min-delta seconds are ignored, they are noise on short stages).
+--save-baseline stores this run as the new baseline for those sizes.
+
+Usage:
+    python benchmarks/bench_suite.py [--lines 100k 1M ...] [--seed 42] [--baseline FILE]
+                                     [--repeat 5] [--save-baseline] [--tolerance 0.25]
+                                     [--min-delta 0.05] [--keep DIR]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import statistics
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from synth_syslog import SyslogModel, parse_size
+
+STAGES = ["clean", "parse", "merge", "sort", "report", "charts"]
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+def peak_rss_mb():
+    """Peak RSS of this process (VmHWM; ru_maxrss would include the parent's peak after exec)."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+    except (OSError, StopIteration):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ==========================================
+# CHILD: one stage per process
+# ==========================================
+def run_stage(stage, path):
+    """Runs one stage on 'path'. Returns (seconds, output_path)."""
+    if stage == "clean":
+        from cleaner import clean_log_file
+        start = time.perf_counter()
+        output = clean_log_file(path, fast=True)[0]
+        return time.perf_counter() - start, output
+    if stage == "parse":
+        from parser import parse_log_file, STREAM_MIN_BYTES
+        start = time.perf_counter()
+        output = parse_log_file(path, two_phase=True, workers=os.cpu_count(),
+                                stream=os.path.getsize(path) >= STREAM_MIN_BYTES)[0]
+        return time.perf_counter() - start, output
+    if stage == "merge":
+        from report_engine import step_1_merge_sentences
+        start = time.perf_counter()
+        output = step_1_merge_sentences(path)
+        return time.perf_counter() - start, output
+    if stage == "sort":
+        from report_engine import step_2_sort_logs
+        start = time.perf_counter()
+        output = step_2_sort_logs(path)
+        return time.perf_counter() - start, output
+    if stage == "report":
+        from report_engine import step_3_generate_report
+        start = time.perf_counter()
+        output = step_3_generate_report(path, charts=False)
+        return time.perf_counter() - start, output
+    if stage == "charts":
+        import report_engine
+        timed = {"seconds": 0.0}
+        create_all_charts = report_engine.create_all_charts
+        def timed_charts(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return create_all_charts(*args, **kwargs)
+            finally:
+                timed["seconds"] += time.perf_counter() - start
+        report_engine.create_all_charts = timed_charts
+        output = report_engine.step_3_generate_report(path, charts=True)
+        return timed["seconds"], os.path.dirname(output)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def child_main(stage, path):
+    seconds, output = run_stage(stage, path)
+    print(json.dumps({"seconds": seconds, "peak_mb": peak_rss_mb(), "output": output}))
+
+
+def spawn_stage(stage, path):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", stage, path],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Stage '{stage}' failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ==========================================
+# PARENT: generate, run, compare
+# ==========================================
+def stub_meanings(parsed):
+    """Stand-in for the LLM stage: '_meaning' artifact whose Event Meaning is the template text."""
+    from artifact_store import read_sheet, write_sheets
+    meaning = parsed.replace("_analysis", "_meaning")
+    shutil.rmtree(meaning, ignore_errors=True)
+    shutil.copytree(parsed, meaning)
+    summary = read_sheet(parsed, 'Template Summary')
+    summary['Event Meaning'] = summary['Template Pattern']
+    write_sheets(meaning, {'Template Summary': summary})
+    return meaning
+
+
+def count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def run_size(model, lines, seed, work_dir, repeat=1):
+    """Generates one input and runs every stage ('repeat' times, median kept). Returns {stage: metrics}."""
+    log_file = os.path.join(work_dir, f"synth_{lines}.log")
+    start = time.perf_counter()
+    model.generate(log_file, lines, seed=seed)
+    print(f"[SUITE] Generated {lines:,} lines in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(log_file) / 2**20:,.0f} MB)")
+
+    results = {}
+    path = log_file
+    kept = lines
+    for stage in STAGES:
+        if stage == "merge":
+            path = stub_meanings(path)
+        runs = [spawn_stage(stage, path) for _ in range(repeat)]
+        metrics = {"seconds": statistics.median(m["seconds"] for m in runs),
+                   "peak_mb": statistics.median(m["peak_mb"] for m in runs),
+                   "output": runs[-1]["output"]}
+        rows = lines if stage == "clean" else kept
+        results[stage] = {
+            "seconds": round(metrics["seconds"], 3),
+            "lines_per_sec": round(rows / metrics["seconds"], 1) if metrics["seconds"] > 0 else 0.0,
+            "peak_mb": round(metrics["peak_mb"], 1),
+        }
+        if stage == "clean":
+            kept = count_lines(metrics["output"])
+        if stage in ("clean", "parse", "merge", "sort"): # report/charts both read the sorted artifact
+            path = metrics["output"]
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta=0.0):
+    """Prints the table; returns the list of regressions (time deltas under min_delta seconds don't count)."""
+    regressions = []
+    print(f"\n{'lines':>10} {'stage':<8}{'seconds':>10}{'lines/s':>12}{'peak MB':>10}   vs baseline")
+    for size, stages in results.items():
+        base_stages = baseline.get("sizes", {}).get(size, {})
+        for stage, m in stages.items():
+            notes = []
+            base = base_stages.get(stage)
+            if base:
+                for key, label in (("seconds", "time"), ("peak_mb", "rss")):
+                    if not base.get(key):
+                        continue
+                    change = m[key] / base[key] - 1
+                    notes.append(f"{label} {change:+.0%}")
+                    if change > tolerance and (key != "seconds" or m[key] - base[key] >= min_delta):
+                        regressions.append(f"{size} lines / {stage}: {label} {change:+.0%}")
+            print(f"{int(size):>10,} {stage:<8}{m['seconds']:>10.2f}{m['lines_per_sec']:>12,.0f}"
+                  f"{m['peak_mb']:>10.0f}   {', '.join(notes) if notes else '(no baseline)'}")
+    return regressions
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        return child_main(sys.argv[2], sys.argv[3])
+
+    ap = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic syslog.")
+    ap.add_argument("--lines", nargs="+", default=["100k"], help="sizes to run (100k ... 50M)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per stage, the median counts")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / RSS growth (0.25 = 25%%)")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns under this many seconds")
+    ap.add_argument("--keep", help="keep the generated files in this folder")
+    args = ap.parse_args()
+
+    work_dir = args.keep or tempfile.mkdtemp()
+    os.makedirs(work_dir, exist_ok=True)
+    model = SyslogModel.learn()
+    results = {}
+    try:
+        for size in args.lines:
+            lines = parse_size(size)
+            results[str(lines)] = run_size(model, lines, args.seed, work_dir, args.repeat)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+
+    if args.save_baseline:
+        baseline.setdefault("sizes", {}).update(results)
+        baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                               "cpus": os.cpu_count(), "seed": args.seed, "repeat": args.repeat}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n[SUITE] Baseline saved to {args.baseline}")
+    elif regressions:
+        print("\n[SUITE] Regressions beyond tolerance:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Stub Ollama server for the meaning-generation benchmarks.
+
+Answers the two endpoints llama_meaning_generator uses:
+    GET  /api/tags  -> lists MODEL_NAME, so ensure_model_available() passes
+    POST /api/chat  -> sleeps --latency seconds (+ --item-latency per template), then
+                       replies "Meaning of: <template>"; batch requests (with a 'format')
+                       get a JSON {"meanings": [{"id", "meaning"}, ...]} answer
+    POST /api/generate -> empty answer (what the model warm-up sends)
+The first chat / generate also pays --load-latency, like loading the model.
+At most --parallel chats are served at once (like OLLAMA_NUM_PARALLEL); the rest queue.
+prompt_eval_count is approximated as (system + user characters) / 4.
+--drop-every N makes every Nth batch entry lose its placeholders, to exercise re-queries.
+
+Usage:
+    python benchmarks/stub_ollama.py [--port 11435] [--latency 0.2] [--item-latency 0.0]
+                                     [--parallel 4] [--drop-every 0] [--load-latency 0.0]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+DEFAULT_PORT = 11435
+
+
+def stub_meaning(template):
+    """The reply the stub gives for a template (benchmarks check ordering with it)."""
+    return f"Meaning of: {template}"
+
+
+def make_handler(model_name, latency, item_latency, drop_every, slots, load_latency=0.0):
+    model = {"loaded": False, "lock": threading.Lock()}
+
+    def load_model():
+        with model["lock"]:
+            if not model["loaded"]:
+                time.sleep(load_latency)
+                model["loaded"] = True
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/api/tags":
+                return self._send_json({"models": [{"model": model_name, "name": model_name}]})
+            self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/") == "/api/generate":
+                load_model()
+                return self._send_json({"model": request.get("model", model_name),
+                                        "created_at": "2006-01-01T00:00:00Z", "response": "", "done": True})
+            if self.path.rstrip("/") != "/api/chat":
+                return self._send_json({"error": "not found"}, 404)
+            load_model()
+            prompt = request["messages"][-1]["content"]
+            if request.get("format"):
+                items = json.loads(prompt)
+                content = json.dumps({"meanings": [
+                    {"id": item["id"], "meaning": "Meaning dropped" if drop_every and n % drop_every == drop_every - 1
+                     else stub_meaning(item["template"])}
+                    for n, item in enumerate(items)]})
+            else:
+                items = [prompt[len("Input: "):] if prompt.startswith("Input: ") else prompt]
+                content = stub_meaning(items[0])
+            with slots:
+                time.sleep(latency + item_latency * len(items))
+            self._send_json({
+                "model": request.get("model", model_name),
+                "created_at": "2006-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "prompt_eval_count": sum(len(m["content"]) for m in request["messages"]) // 4,
+            })
+
+        def log_message(self, *args): # Keep the benchmark output clean
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=DEFAULT_PORT, latency=0.2, parallel=4, item_latency=0.0, drop_every=0,
+                      load_latency=0.0, model_name=None):
+    """Starts the stub in a daemon thread. Returns the server (call .shutdown() to stop)."""
+    if model_name is None:
+        from llama_meaning_generator import MODEL_NAME as model_name
+    handler = make_handler(model_name, latency, item_latency, drop_every, threading.BoundedSemaphore(parallel),
+                           load_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve a fake Ollama /api/chat with fixed latency.")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds per chat request")
+    ap.add_argument("--item-latency", type=float, default=0.0, help="extra seconds per template in a request")
+    ap.add_argument("--parallel", type=int, default=4, help="chats served at once")
+    ap.add_argument("--drop-every", type=int, default=0, help="every Nth batch entry loses its placeholders")
+    ap.add_argument("--load-latency", type=float, default=0.0, help="seconds the first request waits (model load)")
+    args = ap.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.parallel, args.item_latency, args.drop_every,
+                               args.load_latency)
+    print(f"[STUB] Ollama stub on http://127.0.0.1:{args.port} "
+          f"(latency {args.latency}s, {args.parallel} parallel). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic syslog generator for the benchmark suite.
+
+Learns a model from the sample logs (Logs/Linux_20k.log by default):
+  * message templates, mined with the parser's own Drain3 configuration,
+    weighted by how often they occur
+  * the values seen in every template slot (users, hosts, IPs, PIDs, ...)
+  * the hostnames
+and writes any number of lines in the same 'Mon dd hh:mm:ss host message' format.
+Digit-only values (PIDs, ports, uids, ...) are re-drawn with the same number of
+digits half of the time, so large files don't just repeat the sample's values.
+Timestamps increase steadily over 'days' days starting on 'start' (default Dec 10,
+so the default 30 days cross a Dec -> Jan rollover). Same seed -> same file.
+
+Usage:
+    python benchmarks/synth_syslog.py OUTPUT --lines 1M [--seed 42] [--days 30] [--source LOG ...]
+"""
+import os
+import re
+import sys
+import random
+import argparse
+import datetime
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from parser import get_miner_config
+from masking_engine import new_template_miner
+
+DEFAULT_SOURCES = [os.path.join(ROOT, 'Logs', 'Linux_20k.log')]
+HEADER = re.compile(r'^([A-Z][a-z]{2})\s+(\d+)\s(\d{2}:\d{2}:\d{2})\s+(\S+)\s+(.*)$')
+SLOT = re.compile(r'<[A-Z]+>|<\*>')
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# Lines are generated in blocks (one random.choices call per block)
+BLOCK_LINES = 10_000
+NUMERIC_JITTER = 0.5
+
+
+def parse_size(text):
+    """'100k' -> 100000, '5M' -> 5000000, '1500' -> 1500."""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}.get(text[-1:], 1)
+    number = text[:-1] if scale > 1 else text
+    return int(float(number) * scale)
+
+
+def _slot_regex(template):
+    """Template -> (compiled regex with one group per slot, literal pieces)."""
+    pieces = SLOT.split(template)
+    pattern = "(.*?)".join(re.escape(piece) for piece in pieces)
+    try:
+        return re.compile(f"^{pattern}$"), pieces
+    except re.error:
+        return None, pieces
+
+
+class SyslogModel:
+    """Template / slot-value distributions learned from real syslog files."""
+    def __init__(self, templates, weights, hosts):
+        self.templates = templates # [(pieces, [values per slot], verbatim_messages)]
+        self.weights = weights
+        self.hosts = hosts
+
+    @classmethod
+    def learn(cls, paths=DEFAULT_SOURCES):
+        miner = new_template_miner(get_miner_config())
+        messages, cluster_ids, hosts = [], [], Counter()
+        for path in paths:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    match = HEADER.match(line.rstrip("\n"))
+                    if not match:
+                        continue
+                    hosts[match.group(4)] += 1
+                    message = match.group(5)
+                    cluster = miner.add_log_message(message)
+                    messages.append(message)
+                    cluster_ids.append(cluster["cluster_id"])
+
+        final = {c.cluster_id: c.get_template() for c in miner.drain.clusters}
+        regexes = {cid: _slot_regex(template) for cid, template in final.items()}
+        slots = {cid: [[] for _ in range(len(pieces) - 1)] for cid, (_, pieces) in regexes.items()}
+        verbatim = {cid: [] for cid in final}
+        counts = Counter(cluster_ids)
+        for message, cid in zip(messages, cluster_ids):
+            regex, _ = regexes[cid]
+            match = regex.match(message) if regex is not None else None
+            if match and len(match.groups()) == len(slots[cid]):
+                for values, value in zip(slots[cid], match.groups()):
+                    values.append(value)
+            else:
+                verbatim[cid].append(message) # Template doesn't round-trip: replay the line
+
+        templates, weights = [], []
+        for cid in final:
+            templates.append((regexes[cid][1], slots[cid], verbatim[cid]))
+            weights.append(counts[cid])
+        return cls(templates, weights, list(hosts.elements()))
+
+    def _fill(self, rng, template):
+        pieces, slots, verbatim = template
+        filled = len(slots[0]) if slots else 0
+        if verbatim and (not slots or rng.random() * (filled + len(verbatim)) >= filled):
+            return rng.choice(verbatim)
+        if not slots:
+            return pieces[0]
+        out = [pieces[0]]
+        for values, piece in zip(slots, pieces[1:]):
+            value = rng.choice(values) if values else ""
+            if value.isdigit() and rng.random() < NUMERIC_JITTER:
+                value = str(rng.randrange(10 ** (len(value) - 1) if len(value) > 1 else 0, 10 ** len(value)))
+            out.append(value)
+            out.append(piece)
+        return "".join(out)
+
+    def generate(self, out_path, lines, seed=42, days=30, start=None):
+        """Writes 'lines' synthetic lines to out_path. Returns out_path."""
+        rng = random.Random(seed)
+        start = start or datetime.datetime(2005, 12, 10)
+        step = days * 86400 / max(lines, 1)
+        elapsed = 0.0
+        written = 0
+        with open(out_path, 'w', encoding='utf-8') as f:
+            while written < lines:
+                block = min(BLOCK_LINES, lines - written)
+                chosen = rng.choices(self.templates, weights=self.weights, k=block)
+                buf = []
+                for template in chosen:
+                    elapsed += rng.expovariate(1.0 / step) if step > 0 else 0.0
+                    stamp = start + datetime.timedelta(seconds=int(elapsed))
+                    buf.append(f"{MONTHS[stamp.month - 1]} {stamp.day:>2} {stamp:%H:%M:%S} "
+                               f"{rng.choice(self.hosts)} {self._fill(rng, template)}\n")
+                f.writelines(buf)
+                written += block
+        return out_path
+
+
+def generate_log(out_path, lines, seed=42, days=30, sources=DEFAULT_SOURCES):
+    """One-call helper: learn from 'sources', then write 'lines' lines."""
+    return SyslogModel.learn(sources).generate(out_path, lines, seed=seed, days=days)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic syslog learned from the sample logs.")
+    ap.add_argument("output")
+    ap.add_argument("--lines", default="100k", help="number of lines (100k, 5M, 50M, ...)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--days", type=float, default=30, help="time span of the generated log")
+    ap.add_argument("--source", action="append", help="sample log(s) to learn from")
+    args = ap.parse_args()
+
+    model = SyslogModel.learn(args.source or DEFAULT_SOURCES)
+    print(f"[SYNTH] Learned {len(model.templates)} templates from {sum(model.weights)} lines.")
+    lines = parse_size(args.lines)
+    model.generate(args.output, lines, seed=args.seed, days=args.days)
+    print(f"[SYNTH] Wrote {lines} lines to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
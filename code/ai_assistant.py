@@ -1,11 +1,26 @@
 import os
-import ollama
+from llama_meaning_generator import KEEP_ALIVE # Same keep-alive as the warm-up, so a chat doesn't shorten it
+
+# The assistant needs Ollama; without it (or in LLAMA_OFFLINE mode) the rest of the pipeline still runs
+try:
+    import ollama
+except ImportError:
+    ollama = None
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
 MODEL_NAME = "llama3.1:8b"
 
+
+def ollama_unavailable():
+    """Error text if the assistant can't call Ollama (offline mode / package missing), else None."""
+    if os.environ.get("LLAMA_OFFLINE", "").strip().lower() in ("1", "true", "yes"):
+        return "Error: The AI assistant is disabled in offline mode (LLAMA_OFFLINE)."
+    if ollama is None:
+        return "Error: The 'ollama' package is not installed."
+    return None
+
 # ==========================================
 # PART 1: INTRO & RISK OVERVIEW
 # Content: Intro, Executive Overview, Security Metrics, Risk Highlights
@@ -180,6 +195,10 @@ def generate_summary(report_path, style="structured"):
     """
     print(f"\n🚀 Generative AI running ({style} mode - 4-Way Split Strategy)...")
 
+    unavailable = ollama_unavailable()
+    if unavailable:
+        return unavailable
+
     # 1. Read Report
     if not os.path.exists(report_path):
         return "Error: Report file not found."
@@ -248,7 +267,7 @@ def generate_summary(report_path, style="structured"):
         r1 = ollama.chat(model=MODEL_NAME, messages=[
             {'role': 'system', 'content': p1},
             {'role': 'user', 'content': part1_text}
-        ])
+        ], keep_alive=KEEP_ALIVE)
         final_parts.append(r1['message']['content'].strip())
 
     # --- PASS 2: Threats ---
@@ -257,7 +276,7 @@ def generate_summary(report_path, style="structured"):
         r2 = ollama.chat(model=MODEL_NAME, messages=[
             {'role': 'system', 'content': p2},
             {'role': 'user', 'content': part2_text}
-        ])
+        ], keep_alive=KEEP_ALIVE)
         final_parts.append(r2['message']['content'].strip())
 
     # --- PASS 3: Sessions ---
@@ -266,7 +285,7 @@ def generate_summary(report_path, style="structured"):
         r3 = ollama.chat(model=MODEL_NAME, messages=[
             {'role': 'system', 'content': p3},
             {'role': 'user', 'content': part3_text}
-        ])
+        ], keep_alive=KEEP_ALIVE)
         final_parts.append(r3['message']['content'].strip())
 
     # --- PASS 4: Anomalies ---
@@ -275,7 +294,7 @@ def generate_summary(report_path, style="structured"):
         r4 = ollama.chat(model=MODEL_NAME, messages=[
             {'role': 'system', 'content': p4},
             {'role': 'user', 'content': part4_text}
-        ])
+        ], keep_alive=KEEP_ALIVE)
         final_parts.append(r4['message']['content'].strip())
 
     # 5. COMBINE
@@ -296,6 +315,10 @@ def chat_with_log(report_path, chat_history, user_question):
     """
     Allows the user to chat with the specific log report context.
     """
+    unavailable = ollama_unavailable()
+    if unavailable:
+        return unavailable
+
     try:
         with open(report_path, "r", encoding="utf-8") as f:
             report_content = f.read()
@@ -319,7 +342,7 @@ def chat_with_log(report_path, chat_history, user_question):
     messages.append({'role': 'user', 'content': user_question})
     
     try:
-        response = ollama.chat(model=MODEL_NAME, messages=messages)
+        response = ollama.chat(model=MODEL_NAME, messages=messages, keep_alive=KEEP_ALIVE)
         return response['message']['content']
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,260 @@
+import os
+import json
+import shutil
+from collections import Counter
+import pandas as pd
+from syslog_header import HEADER_COLUMNS, tokenize_lines
+
+# pyarrow is what pandas uses for Parquet; only the optional Excel export needs openpyxl
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+# ==========================================
+# ARTIFACTS (hand-off format between stages)
+# ==========================================
+# An artifact is a folder with one Parquet file per sheet:
+#   Linux_2k_clean_analysis.artifact/
+#       log_analysis.parquet
+#       template_summary.parquet
+ARTIFACT_EXT = ".artifact"
+SHEETS = ("Log Analysis", "Template Summary")
+
+# Parameter columns: one per extracted tag (TIMESTAMP, HOSTNAME, PID, USERNAME, RHOST, ...)
+# plus the original line number. Tag names are always upper case.
+LINE_INDEX_COLUMN = "Line Index"
+LEADING_PARAMETERS = ("TIMESTAMP", "HOSTNAME")
+NUMERIC_PARAMETERS = ("PID", "UID", "EUID")
+
+# Excel can't hold more rows than this in one sheet
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise RuntimeError("Stage artifacts need the 'pyarrow' package (pip install pyarrow).")
+
+
+def _sheet_file(path, sheet_name):
+    """'Log Analysis' -> <artifact>/log_analysis.parquet"""
+    return os.path.join(path, sheet_name.lower().replace(" ", "_") + ".parquet")
+
+
+def is_parameter_column(name):
+    """Tag columns are the upper-case ones ('USERNAME', 'RHOST', ...)."""
+    return isinstance(name, str) and name.isupper() and name.replace("_", "").isalpha()
+
+
+def parameter_columns(df):
+    """Tag columns of a 'Log Analysis' sheet, TIMESTAMP/HOSTNAME first."""
+    tags = [c for c in df.columns if is_parameter_column(c)]
+    leading = [c for c in LEADING_PARAMETERS if c in tags]
+    return leading + sorted(c for c in tags if c not in leading)
+
+
+def apply_parameter_dtypes(df):
+    """
+    Gives the parameter columns real dtypes: 'Line Index' and the numeric ids
+    (PID/UID/EUID) become Int64 when every value round-trips exactly, the rest 'string'.
+    """
+    if LINE_INDEX_COLUMN in df.columns:
+        df[LINE_INDEX_COLUMN] = pd.to_numeric(df[LINE_INDEX_COLUMN]).astype("Int64")
+    for col in parameter_columns(df):
+        values = df[col].astype("string")
+        if col in NUMERIC_PARAMETERS and values.dropna().str.fullmatch(r"0|[1-9]\d{0,17}").all():
+            df[col] = pd.to_numeric(values).astype("Int64")
+        else:
+            df[col] = values
+    return df
+
+
+def parameter_frame(records, index=None):
+    """[{tag: value, 'Line Index': n}, ...] -> typed parameter columns."""
+    df = pd.DataFrame.from_records(records, index=index)
+    return apply_parameter_dtypes(df)
+
+
+def order_log_columns(df, leading=("Raw Log", "Drained Named Log", "Template ID")):
+    """Fixed columns first, then 'Line Index', then the tag columns, then anything else."""
+    params = parameter_columns(df)
+    front = [c for c in leading if c in df.columns]
+    if LINE_INDEX_COLUMN in df.columns:
+        front.append(LINE_INDEX_COLUMN)
+    rest = [c for c in df.columns if c not in front and c not in params]
+    return df[front + params + rest]
+
+
+def upgrade_legacy_parameters(df):
+    """Older .xlsx runs kept the parameters as one JSON string per row: expand them once."""
+    records = []
+    for raw in df["Parameters"]:
+        try:
+            params = json.loads(str(raw)) if isinstance(raw, str) else {}
+        except ValueError:
+            params = {}
+        if "_Original_Line_Index" in params:
+            params[LINE_INDEX_COLUMN] = params.pop("_Original_Line_Index")
+        records.append(params)
+    df = df.drop(columns=["Parameters"])
+    df = pd.concat([df, parameter_frame(records, index=df.index)], axis=1)
+    return order_log_columns(ensure_header_columns(df))
+
+
+def ensure_header_columns(df):
+    """
+    Artifacts from before the header tokenizer have no Epoch/Service/Service PID:
+    tokenize 'Raw Log' once, in original line order (year rollover depends on it).
+    """
+    if all(col in df.columns for col in HEADER_COLUMNS):
+        return df
+    ordered = df.sort_values(LINE_INDEX_COLUMN, kind="stable") if LINE_INDEX_COLUMN in df.columns else df
+    header = tokenize_lines(ordered["Raw Log"], index=ordered.index)
+    df = df.drop(columns=[c for c in HEADER_COLUMNS if c in df.columns])
+    return pd.concat([df, header.loc[df.index]], axis=1)
+
+
+def artifact_path(stem):
+    """Output path for a stage: 'Logs/Linux_2k_clean_analysis' -> '...analysis.artifact'."""
+    return f"{stem}{ARTIFACT_EXT}"
+
+
+def write_sheets(path, sheets):
+    """
+    Writes {sheet_name: DataFrame} into the artifact folder 'path'.
+    Each sheet goes to a temp file first and is renamed into place.
+    """
+    _require_pyarrow()
+    os.makedirs(path, exist_ok=True)
+    for sheet_name, df in sheets.items():
+        target = _sheet_file(path, sheet_name)
+        tmp_target = f"{target}.tmp"
+        df.to_parquet(tmp_target, index=False, engine="pyarrow")
+        os.replace(tmp_target, target)
+    return path
+
+
+class SheetStreamWriter:
+    """
+    Writes one sheet in batches, so the whole table never has to be in memory:
+    append() spills each batch to a part file, close() merges the parts into the
+    sheet with ONE schema (union of the columns; a numeric id column stays Int64
+    only if it was numeric in every batch) and removes them.
+    """
+    def __init__(self, path, sheet_name, count_column=None):
+        _require_pyarrow()
+        self.target = _sheet_file(path, sheet_name)
+        self.parts_dir = f"{self.target}.parts"
+        shutil.rmtree(self.parts_dir, ignore_errors=True) # Leftovers of an interrupted run
+        self.count_column = count_column
+        self.counts = Counter() # value counts of 'count_column' over all batches
+        self.parts = []
+        self.columns = []
+        self.dtypes = {} # first dtype seen per column
+        self.textual = set() # numeric parameters that had a non-numeric value
+        self.rows = 0
+
+    def append(self, df):
+        """Spills one batch (any columns; parameter dtypes are applied here)."""
+        if df.empty:
+            return
+        df = apply_parameter_dtypes(df)
+        for col in df.columns:
+            if col not in self.dtypes:
+                self.columns.append(col)
+                self.dtypes[col] = df[col].dtype
+            if col in NUMERIC_PARAMETERS and df[col].dtype != "Int64":
+                self.textual.add(col)
+        if self.count_column is not None:
+            self.counts.update(df[self.count_column].value_counts().to_dict())
+        os.makedirs(self.parts_dir, exist_ok=True)
+        part = os.path.join(self.parts_dir, f"part-{len(self.parts):05d}.parquet")
+        df.to_parquet(part, index=False, engine="pyarrow")
+        self.parts.append(part)
+        self.rows += len(df)
+
+    def append_file(self, parquet_file, batch_size=50_000):
+        """Streams an existing sheet file in as batches (e.g. the rows of a resumed run)."""
+        for batch in pq.ParquetFile(parquet_file).iter_batches(batch_size=batch_size):
+            self.append(batch.to_pandas())
+
+    def _unify(self, df):
+        df = df.reindex(columns=self.columns)
+        for col in self.columns:
+            if is_parameter_column(col):
+                as_int = col in NUMERIC_PARAMETERS and col not in self.textual
+                df[col] = pd.to_numeric(df[col]).astype("Int64") if as_int else df[col].astype("string")
+            elif df[col].dtype != self.dtypes[col]:
+                dtype = self.dtypes[col]
+                if pd.api.types.is_integer_dtype(dtype) and df[col].isna().any():
+                    dtype = "Int64" # Column missing from this batch: keep the gaps as NA
+                df[col] = df[col].astype(dtype)
+        return df
+
+    def close(self, transform=None):
+        """
+        Merges the parts into the sheet file (temp file + rename). 'transform' is applied
+        to every unified batch before it is written (same columns out for every batch).
+        Returns the number of rows written.
+        """
+        tmp_target = f"{self.target}.tmp"
+        writer = None
+        try:
+            for part in self.parts:
+                df = self._unify(pd.read_parquet(part, engine="pyarrow"))
+                if transform is not None:
+                    df = transform(df)
+                if writer is None:
+                    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+                    writer = pq.ParquetWriter(tmp_target, table.schema)
+                else:
+                    table = pyarrow.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is not None:
+            os.replace(tmp_target, self.target)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        return self.rows
+
+
+def read_sheet(path, sheet_name, columns=None):
+    """
+    Reads one sheet back as a DataFrame ('columns' loads only those columns).
+    Plain .xlsx paths still work, so older runs can be fed in directly.
+    """
+    if not os.path.isdir(path):
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        if "Parameters" in df.columns:
+            df = upgrade_legacy_parameters(df)
+        return df[columns] if columns else df
+    _require_pyarrow()
+    sheet_file = _sheet_file(path, sheet_name)
+    if not os.path.exists(sheet_file):
+        raise FileNotFoundError(f"Sheet '{sheet_name}' not found in {path}")
+    return pd.read_parquet(sheet_file, columns=columns, engine="pyarrow")
+
+
+def read_sheets(path, sheet_names=SHEETS):
+    """Reads several sheets: {sheet_name: DataFrame}."""
+    return {name: read_sheet(path, name) for name in sheet_names}
+
+
+def export_excel(path, excel_path=None):
+    """
+    Optional human-readable copy of an artifact (same sheets, one .xlsx).
+    Returns the .xlsx path, or None if a sheet is too big for Excel.
+    """
+    if excel_path is None:
+        excel_path = os.path.splitext(path)[0] + ".xlsx"
+    sheets = read_sheets(path, [name for name in SHEETS if os.path.exists(_sheet_file(path, name))])
+    if any(len(df) > EXCEL_MAX_ROWS for df in sheets.values()):
+        print(f"[EXPORT] Skipping Excel export: more than {EXCEL_MAX_ROWS} rows.")
+        return None
+    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"[EXPORT] Excel copy saved to: {os.path.basename(excel_path)}")
+    return excel_path
@@ -1,4 +1,14 @@
 import os
+import io
+import mmap
+import locale
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from log_io import (open_log, open_log_at, detect_compression, split_log_name, compressed_name,
+                    checkpoint_path, load_checkpoint, save_checkpoint, input_fingerprint, resume_offset,
+                    complete_lines_end, at_line_boundary)
 
 # Default blacklist (shared)
 BASE_BLACKLIST = [
@@ -18,6 +28,17 @@ BASE_BLACKLIST = [
     "IIim", "htt", "htt_server", "canna", "named", "rsyncd", "mysqld", "FreeWnn"
 ]
 
+# Parallel cleaning: size of one byte-range task handed to a worker process.
+# Files smaller than this are always cleaned serially.
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Bytes fast path: lines containing any of these can't be judged on raw bytes
+# (CR needs newline translation, \x1c-\x1f count as whitespace for str.split(),
+#  non-ASCII needs decoding) so they take the text path instead.
+_TEXT_PATH_BYTES = (b"\r", b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+_MAX_TOKEN_CACHE = 200_000
+_BYTES_BLOCK = 4 * 1024 * 1024
+
 #funciton to extract process name from a log line
 def extract_process_name(line: str) -> str | None:
     tokens = line.strip().split()
@@ -25,17 +46,366 @@ def extract_process_name(line: str) -> str | None:
         return None
     return tokens[4] # Assuming the process name is the 5th token
 
+def normalize_process_name(proc: str) -> str:
+    """ "sshd[123]:"  -->  "sshd" (strip the PID brackets and colons)."""
+    return proc.split("[")[0].rstrip(":")
+
+
+class BlacklistMatcher:
+    """
+    Prefix-trie over the blacklist keywords.
+    One walk over the process token finds the LONGEST keyword it starts with,
+    so the cost no longer grows with the size of the blacklist.
+    """
+    _END = None # Marker key: the node completes a keyword
+
+    def __init__(self, keywords):
+        self.keywords = set(keywords)
+        self._root = {}
+        for word in self.keywords:
+            if not word:
+                continue
+            node = self._root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[self._END] = word
+
+    def match(self, proc):
+        """Returns the longest keyword that 'proc' starts with, or None."""
+        node = self._root
+        matched = None
+        for ch in proc:
+            node = node.get(ch)
+            if node is None:
+                break
+            word = node.get(self._END)
+            if word is not None:
+                matched = word
+        return matched
+
+    def extends(self, name):
+        """True if some keyword is longer than 'name' and starts with it (e.g. "ftpd[" for "ftpd")."""
+        node = self._root
+        for ch in name:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return any(key is not self._END for key in node)
+
+
+def build_blacklist_matcher(extra_blacklist=None, base=BASE_BLACKLIST):
+    """Compiles the default blacklist + any UI keywords into one matcher."""
+    return BlacklistMatcher(set(base) | set(extra_blacklist or []))
+
+
+class HistogramMatcher:
+    """
+    Serves blacklist decisions from a scan histogram: every process name seen by
+    scan_log_file() is matched ONCE up front, so the write pass is a dict lookup.
+    Names some keyword runs past ("ftpd" with "ftpd[" blacklisted) depend on the
+    rest of the token, so those are matched on the raw token like without a scan.
+    """
+    _RAW = object() # Decision needs the raw token
+
+    def __init__(self, matcher, scan):
+        self.matcher = matcher
+        self.keywords = matcher.keywords
+        self.decisions = {name: self._RAW if matcher.extends(name) else matcher.match(name) for name in scan}
+
+    def match(self, proc):
+        decision = self.decisions.get(normalize_process_name(proc), self._RAW) # Missing: file changed since the scan?
+        return self.matcher.match(proc) if decision is self._RAW else decision
+
+
+def scan_log_file(input_filename: str):
+    """
+    Reads the file ONCE and builds a per-process histogram.
+
+    Returns:
+        dict: {process_name: {"count": n, "first_line": i, "last_line": j}}
+              (line numbers are 1-based; lines without a process token are skipped)
+    """
+    histogram = {}
+    if not os.path.exists(input_filename):
+        return histogram
+
+    with open_log(input_filename, "r") as infile:
+        for line_no, line in enumerate(infile, start=1):
+            proc = extract_process_name(line)
+            if proc is None:
+                continue
+            name = normalize_process_name(proc)
+            entry = histogram.get(name)
+            if entry is None:
+                histogram[name] = {"count": 1, "first_line": line_no, "last_line": line_no}
+            else:
+                entry["count"] += 1
+                entry["last_line"] = line_no
+    return histogram
+
+
+def _filter_lines(lines, matcher, outfile, trashfile):
+    """
+    Core cleaning loop shared by the serial and parallel paths.
+    Returns: (kept_count, removed_count)
+    """
+    removed_count = 0
+    kept_count = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        proc = extract_process_name(line)
+        if proc is None:
+            outfile.write(line); kept_count += 1; continue # In case if line proc cant be found, its kept safe.
+
+        # Prefix match (better than == as linux has proc[id] instead of proc alone)
+        matched = matcher.match(proc)
+
+        if matched:
+            trashfile.write(f"[MATCHED: {matched}] {line}")
+            removed_count += 1
+        else:
+            outfile.write(line)
+            kept_count += 1
+    return kept_count, removed_count
 
-def clean_log_file(input_filename: str, extra_blacklist=None):
+
+def _filter_bytes(buf, start, end, matcher, outfile, trashfile):
+    """
+    Bytes-level version of _filter_lines() over buf[start:end] (bytes or mmap).
+    Finds the process token with bytes ops and copies line slices straight to the
+    BINARY outfile/trashfile, without decoding. Lines that aren't plain ASCII go
+    through _filter_lines() so the output is identical to the text path.
+    Returns: (kept_count, removed_count)
+    """
+    encoding = locale.getpreferredencoding(False) # What open(path, "r") would use
+    decisions = {} # process token -> trash prefix (None = keep)
+    removed_count = 0
+    kept_count = 0
+
+    pos = start
+    while pos < end:
+        # 1. Cut a block that ends on a line boundary
+        block_end = min(pos + _BYTES_BLOCK, end)
+        if block_end < end:
+            nl = buf.rfind(b"\n", pos, block_end)
+            if nl == -1:
+                nl = buf.find(b"\n", block_end, end)
+            block_end = end if nl == -1 else nl + 1
+        block = buf[pos:block_end]
+        pos = block_end
+
+        kept_lines = []
+        trash_lines = []
+
+        # 2. Whole block is plain ASCII (the common case): no per-line checks needed
+        if not _needs_text_path(block):
+            lines = block.splitlines(keepends=True)
+        else:
+            lines = []
+            for line in block.splitlines(keepends=True) if b"\r" not in block else _split_on_lf(block):
+                if not _needs_text_path(line):
+                    lines.append(line)
+                    continue
+                # Text fallback for this line only (surrogateescape keeps undecodable bytes intact)
+                text = line.decode(encoding, errors="surrogateescape")
+                text_out, text_trash = io.StringIO(), io.StringIO()
+                k, r = _filter_lines(io.StringIO(text, newline=None), matcher, text_out, text_trash)
+                # Flush the plain lines before it first, to keep the original line order
+                k2, r2 = _filter_byte_lines(lines, matcher, decisions, encoding, kept_lines, trash_lines)
+                lines = []
+                kept_lines.append(text_out.getvalue().encode(encoding, errors="surrogateescape"))
+                trash_lines.append(text_trash.getvalue().encode(encoding, errors="surrogateescape"))
+                kept_count += k + k2
+                removed_count += r + r2
+
+        k, r = _filter_byte_lines(lines, matcher, decisions, encoding, kept_lines, trash_lines)
+        kept_count += k
+        removed_count += r
+
+        # 3. One write per block
+        outfile.write(b"".join(kept_lines))
+        trashfile.write(b"".join(trash_lines))
+    return kept_count, removed_count
+
+
+def _needs_text_path(data):
+    """True if 'data' has anything the bytes path can't handle (isascii/memchr are C-speed)."""
+    if not data.isascii():
+        return True
+    for special in _TEXT_PATH_BYTES:
+        if special in data:
+            return True
+    return False
+
+
+def _split_on_lf(block):
+    """Splits on b"\n" only (bytes.splitlines() would also split on a lone b"\r")."""
+    lines = block.split(b"\n")
+    last = lines.pop()
+    lines = [line + b"\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _filter_byte_lines(lines, matcher, decisions, encoding, kept_lines, trash_lines):
+    """Hot loop of the bytes path: plain ASCII lines only. Returns: (kept_count, removed_count)"""
+    kept_append = kept_lines.append
+    trash_append = trash_lines.append
+    kept_count = 0
+    removed_count = 0
+    for line in lines:
+        tokens = line.split(None, 5)
+        if len(tokens) < 5:
+            if tokens:
+                kept_append(line); kept_count += 1 # No process token -> kept safe
+            continue # (no tokens at all = blank line)
+
+        proc = tokens[4]
+        try:
+            prefix = decisions[proc]
+        except KeyError:
+            matched = matcher.match(proc.decode("ascii"))
+            prefix = f"[MATCHED: {matched}] ".encode(encoding) if matched else None
+            if len(decisions) >= _MAX_TOKEN_CACHE:
+                decisions.clear()
+            decisions[proc] = prefix
+
+        if prefix is None:
+            kept_append(line)
+            kept_count += 1
+        else:
+            trash_append(prefix)
+            trash_append(line)
+            removed_count += 1
+    return kept_count, removed_count
+
+
+def _clean_mmap(input_filename, matcher, output_filename, trash_filename, start_offset=0, append=False, end=None):
+    """
+    Memory-maps the input and runs the bytes fast path from 'start_offset' to 'end' (default EOF).
+    Returns: (kept_count, removed_count, end_offset)
+    """
+    mode = "ab" if append else "wb"
+    with open(input_filename, "rb") as f, \
+         open(output_filename, mode, buffering=1024 * 1024) as outfile, \
+         open(trash_filename, mode, buffering=1024 * 1024) as trashfile:
+        size = os.fstat(f.fileno()).st_size if end is None else end
+        if size <= start_offset:
+            return 0, 0, size # Nothing new (mmap can't map an empty file anyway)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            kept, removed = _filter_bytes(mm, start_offset, size, matcher, outfile, trashfile)
+    return kept, removed, size
+
+
+def _split_byte_ranges(input_filename, chunk_bytes=None, size=None):
+    """
+    Splits the first 'size' bytes of a file (default: all of it) into [start, end)
+    byte ranges that always begin on a line start, so no line is ever cut between two workers.
+    """
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    size = os.path.getsize(input_filename) if size is None else size
+    bounds = [0]
+    with open(input_filename, "rb") as f:
+        pos = chunk_bytes
+        while pos < size:
+            # Move to the first line start at or after 'pos'
+            f.seek(pos - 1)
+            f.readline()
+            start = f.tell()
+            if start >= size:
+                break
+            if start > bounds[-1]:
+                bounds.append(start)
+            pos = start + chunk_bytes
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _clean_byte_range(task):
+    """
+    Worker: cleans one byte range into its own part files.
+    Runs in a child process, so everything it needs comes in through 'task'.
+    """
+    input_filename, start, end, keywords, out_part, trash_part, fast = task
+    matcher = BlacklistMatcher(keywords)
+
+    with open(input_filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if fast:
+        with open(out_part, "wb") as outfile, open(trash_part, "wb") as trashfile:
+            return _filter_bytes(data, 0, len(data), matcher, outfile, trashfile)
+
+    # Same decoding/newline handling as the serial open(input_filename, "r")
+    lines = io.TextIOWrapper(io.BytesIO(data))
+    with open(out_part, "w") as outfile, open(trash_part, "w") as trashfile:
+        kept, removed = _filter_lines(lines, matcher, outfile, trashfile)
+    return kept, removed
+
+
+def _clean_parallel(input_filename, matcher, output_filename, trash_filename, workers, compress_output=None, fast=False,
+                    end=None):
+    """
+    Filters newline-aligned byte ranges (up to 'end', default EOF) in a process pool,
+    then stitches the part files back together in original order.
+    """
+    ranges = _split_byte_ranges(input_filename, size=end)
+    part_dir = tempfile.mkdtemp(prefix="clean_parts_", dir=os.path.dirname(os.path.abspath(output_filename)))
+    try:
+        tasks = []
+        for i, (start, end) in enumerate(ranges):
+            tasks.append((
+                input_filename, start, end, matcher.keywords,
+                os.path.join(part_dir, f"{i}.clean"),
+                os.path.join(part_dir, f"{i}.trash"),
+                fast,
+            ))
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_clean_byte_range, tasks)) # map() keeps task order
+
+        # Stitch parts in order, as bytes (parts are already in the output encoding)
+        with open_log(output_filename, "wb", compression=compress_output) as outfile, \
+             open_log(trash_filename, "wb", compression=compress_output) as trashfile:
+            for task in tasks:
+                with open(task[4], "rb") as part:
+                    shutil.copyfileobj(part, outfile)
+                with open(task[5], "rb") as part:
+                    shutil.copyfileobj(part, trashfile)
+
+        kept_count = sum(r[0] for r in results)
+        removed_count = sum(r[1] for r in results)
+        return kept_count, removed_count, ranges[-1][1]
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+
+def clean_log_file(input_filename: str, extra_blacklist=None, workers=1, compress_output=None, scan=None, resume=False, fast=False):
     """
     Reads a log file and removes lines matching the blacklist.
+    .gz/.bz2/.xz/.zst inputs are stream-decompressed (detected by magic bytes).
     
     Args:
         input_filename (str): Path to the log file (e.g., 'Logs/Linux_2k.log')
         extra_blacklist (list): Optional list of custom keywords from the UI.
+        workers (int): Worker processes. > 1 filters CHUNK_BYTES ranges in parallel
+                       (files smaller than one chunk, and compressed inputs, are cleaned serially).
+        compress_output (str): Optional 'gz' | 'bz2' | 'xz' | 'zst' for the _clean/_trash files.
+        scan (dict): Optional histogram from scan_log_file(); blacklist decisions are then
+                     made once per process name instead of once per line.
+        resume (bool): Only clean the lines appended since the last run (see the
+                       '_clean.checkpoint.json' sidecar) and append them to the existing outputs.
+                       Falls back to a full run if the file was rotated/truncated or the blacklist changed.
+                       A last line still being written (no newline yet) is left for the next run.
+        fast (bool): Memory-map the input and filter raw bytes (no decode/encode per line).
+                     Only used for plain inputs and outputs; otherwise the text path runs.
         
     Returns:
         tuple: (output_path, trash_path, kept_count, removed_count)
+               Counts always cover the WHOLE file, including lines from earlier runs.
     """
     
     if not os.path.exists(input_filename):
@@ -43,72 +413,102 @@ def clean_log_file(input_filename: str, extra_blacklist=None):
         return None, None, 0, 0
 
     # Merge the default blacklist with any new words the user typed in the UI
-    blacklist = set(BASE_BLACKLIST) | set(extra_blacklist or [])
+    matcher = build_blacklist_matcher(extra_blacklist)
     
-    base_name, extension = os.path.splitext(input_filename)
-    output_filename = f"{base_name}_clean{extension}"
-    trash_filename = f"{base_name}_trash{extension}"
-    removed_count = 0
-    kept_count = 0
+    base_name, extension = split_log_name(input_filename)
+    output_filename = compressed_name(f"{base_name}_clean{extension}", compress_output)
+    trash_filename = compressed_name(f"{base_name}_trash{extension}", compress_output)
+
+    # Checkpoint sidecar: where the previous run stopped, and with which settings
+    ckpt_file = checkpoint_path(f"{base_name}_clean")
+    blacklist_sig = hashlib.sha256("\n".join(sorted(matcher.keywords)).encode("utf-8")).hexdigest()
+    start_offset, prev_kept, prev_removed = 0, 0, 0
+    if resume:
+        ckpt = load_checkpoint(ckpt_file)
+        if ckpt and ckpt.get("blacklist") == blacklist_sig \
+                and ckpt.get("compress_output") == compress_output \
+                and os.path.exists(output_filename) and os.path.exists(trash_filename):
+            start_offset = resume_offset(input_filename, ckpt)
+            if start_offset:
+                prev_kept, prev_removed = ckpt["kept"], ckpt["removed"]
+                print(f"[CHECKPOINT] Resuming clean at byte {start_offset}.")
 
     try:
-        with open(input_filename, "r") as infile, \
-             open(output_filename, "w") as outfile, \
-             open(trash_filename, "w") as trashfile:
+        workers = workers or os.cpu_count() or 1
+        line_matcher = HistogramMatcher(matcher, scan) if scan else matcher
+        # Byte ranges/offsets only make sense on a plain (seekable) file
+        is_plain = detect_compression(input_filename) is None
+        use_bytes = fast and is_plain and compress_output is None
+        end_offset = None
+        # Incremental runs stop at the last complete line; a partial one waits for the next run
+        limit = complete_lines_end(input_filename) if resume and is_plain else None
+        if limit is not None and limit < os.path.getsize(input_filename):
+            print("[CHECKPOINT] Last line is incomplete; leaving it for the next run.")
 
-            for line in infile:
-                if not line.strip():
-                    continue
-                proc = extract_process_name(line)
-                if proc is None:
-                    outfile.write(line); kept_count += 1; continue # In case if line proc cant be found, its kept safe.
-
-                matched = None
-                for bad in blacklist:
-                    if proc.startswith(bad): # better than == as linux has proc[id] instead of proc alone.
-                        matched = bad
-                        break
-
-                if matched:
-                    trashfile.write(f"[MATCHED: {matched}] {line}")
-                    removed_count += 1
-                else:
-                    outfile.write(line)
-                    kept_count += 1
+        if start_offset and use_bytes:
+            kept_count, removed_count, end_offset = _clean_mmap(input_filename, line_matcher, output_filename, trash_filename, start_offset, append=True, end=limit)
+        elif start_offset:
+            # Incremental: filter only the appended tail and append to the outputs
+            with open_log_at(input_filename, start_offset, end=limit) as infile, \
+                 open_log(output_filename, "a", compression=compress_output) as outfile, \
+                 open_log(trash_filename, "a", compression=compress_output) as trashfile:
+                kept_count, removed_count = _filter_lines(infile, line_matcher, outfile, trashfile)
+                end_offset = infile.buffer.tell()
+        elif workers > 1 and is_plain and os.path.getsize(input_filename) > CHUNK_BYTES:
+            kept_count, removed_count, end_offset = _clean_parallel(input_filename, matcher, output_filename, trash_filename, workers, compress_output, fast=use_bytes, end=limit)
+        elif use_bytes:
+            kept_count, removed_count, end_offset = _clean_mmap(input_filename, line_matcher, output_filename, trash_filename, end=limit)
+        else:
+            opener = open_log_at(input_filename, end=limit) if is_plain else open_log(input_filename, "r")
+            with opener as infile, \
+                 open_log(output_filename, "w", compression=compress_output) as outfile, \
+                 open_log(trash_filename, "w", compression=compress_output) as trashfile:
+                kept_count, removed_count = _filter_lines(infile, line_matcher, outfile, trashfile)
+                if is_plain:
+                    end_offset = infile.buffer.tell()
+
+        kept_count += prev_kept
+        removed_count += prev_removed
+
+        # A run that ended inside a line can't be resumed safely (the rest of that line would
+        # come back as a new line): no checkpoint, the next resume does a full pass
+        if end_offset is not None and not at_line_boundary(input_filename, end_offset):
+            end_offset = None
+            if os.path.exists(ckpt_file):
+                os.remove(ckpt_file)
+        if end_offset is not None:
+            save_checkpoint(ckpt_file, {
+                **input_fingerprint(input_filename, end_offset),
+                "blacklist": blacklist_sig,
+                "compress_output": compress_output,
+                "kept": kept_count,
+                "removed": removed_count,
+            })
 
         return output_filename, trash_filename, kept_count, removed_count
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return None
 
-def find_new_processes(input_filename: str, known=None):
-    """Return a sorted set of process tokens not in known."""
+def find_new_processes(input_filename: str, known=None, scan=None):
+    """
+    Return a sorted set of process tokens not in known.
+    Pass 'scan' (from scan_log_file) to answer from the histogram without re-reading the file.
+    """
     
     # 1. SETUP KNOWN LIST
     # If you provide a list (known), use it. Otherwise, use the default BASE_BLACKLIST.
     # This matches 'what we already know to filter'.
-    known = set(known or BASE_BLACKLIST)
-    
-    unseen = set()
-    
-    if not os.path.exists(input_filename):
-        return unseen
-        
-    with open(input_filename, "r") as infile:
-        for line in infile:
-            # Helper to get "sshd[123]" from the line
-            proc = extract_process_name(line or "")
-            
-            # 2. CHECK IF NEW
-            # If we found a process name AND it does NOT start with any known keyword...
-            if proc and not any(proc.startswith(k) for k in known):
-                
-                # 3. NORMALIZE IT
-                # "sshd[123]:"  -->  "sshd"
-                # We strip the PID brackets and colons so we get the clean service name.
-                clean_name = proc.split("[")[0].rstrip(":")
-                unseen.add(clean_name)
-                
+    matcher = BlacklistMatcher(known or BASE_BLACKLIST)
+
+    # 2. BUILD (OR REUSE) THE HISTOGRAM
+    if scan is None:
+        scan = scan_log_file(input_filename)
+
+    # 3. CHECK IF NEW
+    # Keep every process name that does NOT start with any known keyword
+    # (names are already normalized: "sshd[123]:" --> "sshd")
+    unseen = {name for name in scan if matcher.match(name) is None}
+
     # Return a clean, alphabetized list of "new stuff"
     return sorted(unseen)
-
@@ -4,6 +4,13 @@ matplotlib.use('Agg') # Headless mode
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
+def volume_peak(df_logs, resample_rule, date_format):
+    """(peak_time_string, peak_volume) of the log volume, without drawing anything."""
+    time_counts = df_logs.resample(resample_rule, on='datetime').size()
+    if time_counts.empty:
+        return "N/A", 0
+    return time_counts.idxmax().strftime(date_format), time_counts.max()
+
 def create_all_charts(df_logs, output_dir, resample_rule, time_unit, date_format, xlabel_text):
     """
     Generates 5 visualization charts (Charts 1-5).
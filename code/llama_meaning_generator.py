@@ -1,14 +1,50 @@
 import os
 import json
+import time
+import threading
 import pandas as pd
-import ollama
 import shutil      # <--- ADD THIS
 import subprocess  # <--- ADD THIS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from artifact_store import artifact_path, read_sheet, write_sheets
+from meaning_cache import MeaningCache, prompt_hash
+from template_similarity import SimilarityIndex
+from rule_meanings import rule_meaning, fallback_meaning, keeps_placeholders
+
+# Only needed when templates go to the LLM; offline mode runs without it
+try:
+    import ollama
+except ImportError:
+    ollama = None
 # Configuration
 MODEL_NAME = "llama3.1:8b" 
 
+# How long Ollama keeps the model loaded after the warm-up and after each request
+KEEP_ALIVE = os.environ.get("LLAMA_KEEP_ALIVE", "30m")
+
+# A successful health check (GPU + model present) is reused for this many seconds
+HEALTH_TTL = float(os.environ.get("LLAMA_HEALTH_TTL", "600"))
+
+# Max Ollama requests open at once (the server runs OLLAMA_NUM_PARALLEL of them in parallel)
+MAX_IN_FLIGHT = int(os.environ.get("LLAMA_MAX_IN_FLIGHT", "4"))
+
+# Templates packed into one request (1 = one request per template, the old behaviour)
+BATCH_SIZE = int(os.environ.get("LLAMA_BATCH_SIZE", "8"))
+
+# Templates matching a rule of rule_meanings.py skip the LLM (LLAMA_RULES=0 turns that off)
+RULES_ENABLED = os.environ.get("LLAMA_RULES", "1").strip() != "0"
+
+# Offline mode: rule engine, cache and similar templates only, never Ollama
+OFFLINE = os.environ.get("LLAMA_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+
+# Uncached templates reuse the meaning of a cached variant at least this similar
+# (token Jaccard on the masked template, 0..1); 0 turns reuse off
+REUSE_THRESHOLD = float(os.environ.get("LLAMA_REUSE_THRESHOLD", "0.75"))
+
 # Cache Configuration
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
+CACHE_DB = os.path.join(CACHE_DIR, "template_meanings.sqlite3")
+# Old JSON cache, imported into CACHE_DB on first use
 CACHE_FILE = os.path.join(CACHE_DIR, "template_meanings.json")
 
 # ==========================================
@@ -77,34 +113,68 @@ def ensure_model_available():
         return False
     return True
 
-# ==========================================
-# 1. CACHE FUNCTIONS
-# ==========================================
-def load_template_cache():
-    """Loads the dictionary of {template_pattern: meaning} from JSON."""
-    if not os.path.exists(CACHE_FILE):
-        print(f"[CACHE] No existing cache found at: {CACHE_FILE}")
-        return {}
-    try:
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # FIX: Normalize keys on load to ensure matching works
-            normalized_data = {k.strip(): v for k, v in data.items()}
-            print(f"[CACHE] Loaded {len(normalized_data)} templates from: {CACHE_FILE}")
-            return normalized_data
-    except Exception as e:
-        print(f"[CACHE] Warning: Could not read cache file ({e}). Starting fresh.")
-        return {}
+# Only successful checks are cached: a stopped Ollama is re-checked on the next click
+_health = {"checked_at": None, "model_ready": False}
+_health_lock = threading.Lock()
 
-def save_template_cache(cache_data):
-    """Saves the updated dictionary to JSON."""
+def ollama_health(force=False):
+    """
+    Runs check_system_resources() + ensure_model_available(), unless a successful
+    check is younger than HEALTH_TTL. Returns True if the model is ready.
+    """
+    with _health_lock: # A click during the startup check waits for it instead of repeating it
+        age = None if _health["checked_at"] is None else time.monotonic() - _health["checked_at"]
+        if _health["model_ready"] and age is not None and age < HEALTH_TTL and not force:
+            print(f"[HEALTH] Using the check from {age:.0f}s ago: '{MODEL_NAME}' is ready.")
+            return True
+        check_system_resources()
+        ready = ensure_model_available()
+        _health.update(checked_at=time.monotonic(), model_ready=ready)
+        return ready
+
+def warm_up_model():
+    """Loads the model with an empty prompt and keeps it loaded for KEEP_ALIVE."""
     try:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=4, ensure_ascii=False)
-        print(f"[CACHE] Saved cache to disk ({len(cache_data)} total items).")
+        start = time.perf_counter()
+        ollama.generate(model=MODEL_NAME, prompt="", keep_alive=KEEP_ALIVE)
+        print(f"[WARMUP] '{MODEL_NAME}' loaded in {time.perf_counter() - start:.1f}s (kept for {KEEP_ALIVE}).")
+        return True
     except Exception as e:
-        print(f"[CACHE] Error saving cache: {e}")
+        print(f"[WARMUP] Could not pre-load '{MODEL_NAME}': {e}")
+        return False
+
+def start_background_warmup():
+    """
+    Health check + model warm-up in a daemon thread, for server start.
+    Returns the thread (None in offline mode or without the ollama package).
+    """
+    if OFFLINE or ollama is None:
+        print("[WARMUP] Skipped (offline mode or no 'ollama' package).")
+        return None
+
+    def run():
+        if ollama_health():
+            warm_up_model()
+
+    thread = threading.Thread(target=run, name="ollama-warmup", daemon=True)
+    thread.start()
+    return thread
+
+# ==========================================
+# 1. CACHE FUNCTIONS
+# ==========================================
+def open_meaning_cache():
+    """Opens the SQLite cache for MODEL_NAME + the current prompts (importing the old JSON cache once)."""
+    cache = MeaningCache(CACHE_DB, MODEL_NAME, PROMPT_HASH)
+    if os.path.exists(CACHE_FILE):
+        try:
+            imported = cache.import_json(CACHE_FILE)
+            if imported:
+                print(f"[CACHE] Imported {imported} templates from the old JSON cache: {CACHE_FILE}")
+        except Exception as e:
+            print(f"[CACHE] Warning: Could not import {CACHE_FILE} ({e}).")
+    print(f"[CACHE] {len(cache)} meanings cached for {MODEL_NAME} in: {CACHE_DB}")
+    return cache
 
 # ==========================================
 # 2. AI PROMPT
@@ -162,40 +232,164 @@ Input: <TIMESTAMP> <HOSTNAME> unix_chkpwd[<PID>]: check pass; user <USERNAME>
 Output: At <TIMESTAMP>, the Password Verification Helper (unix_chkpwd) running as process <PID> on <HOSTNAME> reported a password check error regarding user <USERNAME>.
 """
 
+BATCH_PROMPT = SYSTEM_PROMPT + """
+### BATCH MODE
+The input is a JSON array of objects {"id": <number>, "template": <log pattern>}.
+Answer with a JSON object {"meanings": [{"id": <same number>, "meaning": <sentence>}, ...]}
+holding exactly one entry per input object. Apply every rule above to each template on its own.
+"""
+
+# Ollama 'format' schema for the batch answer
+BATCH_FORMAT = {
+    "type": "object",
+    "properties": {
+        "meanings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "meaning": {"type": "string"}},
+                "required": ["id", "meaning"],
+            },
+        },
+    },
+    "required": ["meanings"],
+}
+
+# Cached meanings are only reused for the same model and prompt text
+PROMPT_HASH = prompt_hash(SYSTEM_PROMPT, BATCH_PROMPT, json.dumps(BATCH_FORMAT, sort_keys=True))
+
+# Requests sent and prompt tokens Ollama evaluated (prompt_eval_count) since the last reset
+prompt_usage = {"requests": 0, "prompt_tokens": 0}
+_usage_lock = threading.Lock()
+
+def reset_prompt_usage():
+    with _usage_lock:
+        prompt_usage.update(requests=0, prompt_tokens=0)
+
+def _chat(system_prompt, user_content, response_format=None):
+    """One Ollama chat call; records its prompt usage and returns the reply text."""
+    response = ollama.chat(model=MODEL_NAME, messages=[
+        {'role': 'system', 'content': system_prompt},
+        {'role': 'user', 'content': user_content}
+    ], format=response_format, keep_alive=KEEP_ALIVE)
+    with _usage_lock:
+        prompt_usage["requests"] += 1
+        prompt_usage["prompt_tokens"] += response.get('prompt_eval_count') or 0
+    return response['message']['content']
+
+def clean_meaning(text):
+    """Strips quotes, newlines and an 'Output:' prefix from a model answer."""
+    clean_text = str(text).strip().replace('"', '').replace('\n', ' ')
+    
+    # Remove "Output:" prefix if the AI adds it
+    if clean_text.lower().startswith("output:"):
+        clean_text = clean_text[7:].strip()
+    return clean_text
+
 def generate_single_meaning(template_pattern):
     """
     Sends a single template string to Ollama to get the English meaning.
+    Returns None if the call fails (nothing worth caching came back).
     """
     try:
-        response = ollama.chat(model=MODEL_NAME, messages=[
-            {'role': 'system', 'content': SYSTEM_PROMPT},
-            {'role': 'user', 'content': f"Input: {template_pattern}"}
-        ])
-        
-        # Clean up the output
-        clean_text = response['message']['content'].strip().replace('"', '').replace('\n', ' ')
-        
-        # Remove "Output:" prefix if the AI adds it
-        if clean_text.lower().startswith("output:"):
-            clean_text = clean_text[7:].strip()
-            
-        return clean_text
+        return clean_meaning(_chat(SYSTEM_PROMPT, f"Input: {template_pattern}")) or None
     except Exception as e:
         print(f"Error calling Llama: {e}")
-        return template_pattern # Fallback to original
+        return None
+
+def generate_batch_meanings(templates):
+    """
+    Sends several templates in one request and asks for a JSON answer.
+    Returns one meaning per template; None where the answer is missing or
+    dropped a placeholder (the caller re-queries those on their own).
+    """
+    meanings = [None] * len(templates)
+    items = [{"id": i + 1, "template": t} for i, t in enumerate(templates)]
+    try:
+        answer = json.loads(_chat(BATCH_PROMPT, json.dumps(items, ensure_ascii=False), BATCH_FORMAT))
+    except Exception as e:
+        print(f"Error calling Llama (batch of {len(templates)}): {e}")
+        return meanings
+
+    entries = answer.get("meanings", []) if isinstance(answer, dict) else answer
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            i = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < len(templates) and meanings[i] is None:
+            meaning = clean_meaning(entry.get("meaning", ""))
+            if meaning and keeps_placeholders(templates[i], meaning):
+                meanings[i] = meaning
+    return meanings
+
+def _generate_chunk(templates):
+    """
+    One batch request, then single requests for whatever failed validation.
+    Entries stay None where the single request failed as well.
+    """
+    if len(templates) == 1:
+        return [generate_single_meaning(templates[0])]
+    meanings = generate_batch_meanings(templates)
+    for i, meaning in enumerate(meanings):
+        if meaning is None:
+            meanings[i] = generate_single_meaning(templates[i])
+    return meanings
+
+def generate_meanings_concurrently(templates, max_in_flight=MAX_IN_FLIGHT, on_result=None, batch_size=BATCH_SIZE):
+    """
+    Generates a meaning for every template, 'batch_size' templates per request and
+    up to 'max_in_flight' requests open at once. on_result(i, meaning) runs in the
+    calling thread as each request completes (completion order); the returned list
+    is in template order.
+    """
+    batch_size = max(1, batch_size)
+    chunks = [range(start, min(start + batch_size, len(templates))) for start in range(0, len(templates), batch_size)]
+    meanings = [None] * len(templates)
+
+    def store(chunk, chunk_meanings):
+        for i, meaning in zip(chunk, chunk_meanings):
+            meanings[i] = meaning
+            if on_result: on_result(i, meaning)
+
+    if max_in_flight <= 1:
+        for chunk in chunks:
+            store(chunk, _generate_chunk([templates[i] for i in chunk]))
+        return meanings
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        futures = {pool.submit(_generate_chunk, [templates[i] for i in chunk]): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            store(futures[future], future.result()) # _generate_chunk never raises
+    return meanings
 
 # ==========================================
 # 3. MAIN FILE PROCESSOR
 # ==========================================
-def generate_meanings_for_file(input_excel_path):
+def generate_meanings_for_file(input_excel_path, max_in_flight=MAX_IN_FLIGHT, batch_size=BATCH_SIZE, offline=None):
     """
-    Reads the parsed Excel, loops through templates, calls Llama, 
-    and saves the result.
+    Reads the parsed artifact (or an older .xlsx) and gives every template a meaning:
+    the rule engine first, then the cache, then a similar cached template, and only
+    then Llama ('batch_size' per request, 'max_in_flight' requests at a time).
+    Offline mode replaces the Llama step with the rule engine's plain fallback.
+    Saves the result as a '_meaning.artifact'.
+    Returns (save_path, template_count, {"ruled", "cached", "resumed", "reused", "generated", "failed",
+    "fallback", "offline"}). Templates whose call failed show the template itself
+    as their meaning, are not cached, and leave the job 'interrupted'.
     """
+    offline = OFFLINE if offline is None else offline
+
     # --- [NEW] RUN CHECKS FIRST ---
-    check_system_resources()
-    if not ensure_model_available():
-        raise RuntimeError("Ollama model not available. Cannot proceed.")
+    if offline:
+        print("[AI] Offline mode: rule engine + cache only, Ollama is not used.")
+    else:
+        if ollama is None:
+            raise RuntimeError("The 'ollama' package is not installed (pip install ollama), "
+                               "or set LLAMA_OFFLINE=1 to run without it.")
+        if not ollama_health():
+            raise RuntimeError("Ollama model not available. Cannot proceed (LLAMA_OFFLINE=1 runs without it).")
     # ------------------------------
     
     if not os.path.exists(input_excel_path):
@@ -205,8 +399,8 @@ def generate_meanings_for_file(input_excel_path):
     print(f"[AI] Reading templates from: {os.path.basename(input_excel_path)}")
     
     # 1. Read Data
-    df_summary = pd.read_excel(input_excel_path, sheet_name="Template Summary")
-    df_logs = pd.read_excel(input_excel_path, sheet_name="Log Analysis")
+    df_summary = read_sheet(input_excel_path, "Template Summary")
+    df_logs = read_sheet(input_excel_path, "Log Analysis")
     
     # Sort for cleaner processing
     df_summary = df_summary.sort_values(by="Template ID")
@@ -217,9 +411,19 @@ def generate_meanings_for_file(input_excel_path):
     
     template_ids = df_summary['Template ID'].tolist()
     
-    # 2. Load Cache
-    cache = load_template_cache()
+    # 2. Rule Engine (deterministic, never cached)
     final_meanings = [""] * len(templates)
+    ruled = 0
+    for i, t in enumerate(templates):
+        meaning = rule_meaning(t) if RULES_ENABLED else None
+        if meaning is not None:
+            final_meanings[i] = meaning
+            ruled += 1
+    
+    # 2b. Load Cache (and resume this file's job if an earlier run was cut short)
+    cache = open_meaning_cache()
+    resumed = cache.start_job(os.path.abspath(input_excel_path), templates)
+    cached = cache.get_many([t for i, t in enumerate(templates) if not final_meanings[i]])
     
     # 3. Identify New Templates
     new_indices = []
@@ -229,73 +433,125 @@ def generate_meanings_for_file(input_excel_path):
     misses = 0
 
     for i, t in enumerate(templates):
-        if t in cache:
-            final_meanings[i] = cache[t] # Use cached version
+        if final_meanings[i]:
+            continue # Covered by a rule
+        if t in cached:
+            final_meanings[i] = cached[t] # Use cached version
             hits += 1
         else:
             new_indices.append(i) # Mark for generation
             misses += 1
             
     print(f"[AI] Total Templates: {len(templates)}")
+    print(f"[RULES] Rule engine: {ruled} (No AI needed)")
     print(f"[AI] Cache Hits: {hits} (Skipping AI generation)")
     print(f"[AI] Cache Misses: {misses} (Queueing for AI)")
+    resumed = min(resumed, hits)
+    if resumed:
+        print(f"[AI] Resumed: {resumed} meanings were saved by an earlier, unfinished run of this file.")
+
+    # 3b. Reuse the meaning of a near-duplicate cached template (listed in the audit CSV)
+    reuses = []
+    if new_indices and REUSE_THRESHOLD > 0:
+        index = SimilarityIndex(cache.items(), REUSE_THRESHOLD)
+        still_new = []
+        for i in new_indices:
+            match = index.best_match(templates[i])
+            if match is None:
+                still_new.append(i)
+                continue
+            source, score, adapted = match
+            final_meanings[i] = adapted
+            reuses.append({"Template ID": template_ids[i], "Template Pattern": templates[i],
+                           "Similarity": round(score, 3), "Source Template": source, "Event Meaning": adapted})
+        new_indices = still_new
+        print(f"[REUSE] {len(reuses)} of {misses} uncached templates reuse a similar cached meaning "
+              f"(threshold {REUSE_THRESHOLD}).")
+
+    # 3c. Offline: what is left gets the rule engine's plain fallback sentence
+    fallback = 0
+    if offline and new_indices:
+        for i in new_indices:
+            final_meanings[i] = fallback_meaning(templates[i])
+        fallback = len(new_indices)
+        new_indices = []
+        print(f"[RULES] Offline fallback sentence for {fallback} templates.")
     
     # 4. Generate Loop
+    failed = [0] # Calls that failed; their templates stay uncached
     if new_indices:
         print("\n" + "=" * 50)
         print("   STARTING GENERATION LOOP")
         print("=" * 50)
         
-        count = 1
         total_new = len(new_indices)
+        done = [0]
+        print(f"[AI] {batch_size} template(s) per request, up to {max_in_flight} request(s) in flight.")
+        reset_prompt_usage()
 
-        for idx in new_indices:
+        def store_result(pos, meaning):
+            # Runs as each request completes: keep the meaning and upsert it right away
+            idx = new_indices[pos]
             template = templates[idx]
-            t_id = template_ids[idx]
-            
-            # Print status
-            print(f"[{count}/{total_new}] Generating for ID {t_id}...", end="\r")
-            
-            # CALL OLLAMA
-            meaning = generate_single_meaning(template)
-            
-            # Store & Update Cache
+            done[0] += 1
+            if meaning is None:
+                # Failed call: show the template for this run only, never cache it
+                failed[0] += 1
+                meaning = template
+            else:
+                cache.put(template, meaning) # Save stripped key
             final_meanings[idx] = meaning
-            cache[template] = meaning # Save stripped key
-            
+
             # --- NEW FORMATTED OUTPUT ---
-            # Clear the "Generating..." progress line first
-            print(" " * 80, end="\r") 
-            
-            # Line 1: ID & Template
-            print(f"[{t_id}] {template}")
+            # Line 1: Progress, ID & Template
+            print(f"[{done[0]}/{total_new}] [{template_ids[idx]}] {template}")
             
             # Line 2: The Meaning
             print(f"      ↳ {meaning}")
             
             # Optional: Separator for readability
             print("-" * 60) 
-            
-            count += 1
-            
-        # Save Cache to disk
-        save_template_cache(cache)
+
+        # CALL OLLAMA (results land in template order in final_meanings)
+        # put() checkpoints every few templates / seconds; close() saves the rest
+        # even if generation fails, and leaves the job 'interrupted' to resume later
+        # (also when some calls failed, so the next run asks for those again)
+        try:
+            generate_meanings_concurrently([templates[idx] for idx in new_indices], max_in_flight, store_result, batch_size)
+            cache.finish_job("interrupted" if failed[0] else "complete")
+        finally:
+            cache.close()
+        print(f"[AI] {prompt_usage['requests']} request(s), {prompt_usage['prompt_tokens']:,} prompt tokens evaluated.")
+        print(f"[CACHE] Stored {total_new - failed[0]} new meanings.")
+        if failed[0]:
+            print(f"[AI] WARNING: {failed[0]} template(s) failed; showing the template as their meaning. "
+                  "Run again to retry them.")
     else:
-        print("\n[AI] All templates found in cache. No AI calls needed! 🚀")
+        cache.finish_job()
+        cache.close()
+        print("\n[AI] All templates covered by rules, cache or reuse. No AI calls needed! 🚀")
         
-    # 5. Save Output Excel
+    # 5. Save Output Artifact
     df_summary['Event Meaning'] = final_meanings
     
     base_dir = os.path.dirname(input_excel_path)
-    base_name = os.path.basename(input_excel_path)
-    output_filename = base_name.replace("_analysis.xlsx", "_meaning.xlsx")
+    stem, _ext = os.path.splitext(os.path.basename(input_excel_path))
+    output_filename = artifact_path(stem.replace("_analysis", "_meaning"))
     save_path = os.path.join(base_dir, output_filename)
     
-    with pd.ExcelWriter(save_path, engine='openpyxl') as writer:
-        df_logs.to_excel(writer, sheet_name='Log Analysis', index=False)
-        df_summary.to_excel(writer, sheet_name='Template Summary', index=False)
+    write_sheets(save_path, {'Log Analysis': df_logs, 'Template Summary': df_summary})
+
+    # Audit list of reused meanings (removed when this run reused nothing)
+    reuse_path = os.path.join(base_dir, f"{stem.replace('_analysis', '_meaning')}_reuse.csv")
+    if reuses:
+        pd.DataFrame(reuses).to_csv(reuse_path, index=False)
+        print(f"[REUSE] Audit list saved to: {reuse_path}")
+    elif os.path.exists(reuse_path):
+        os.remove(reuse_path)
         
     print(f"[AI] Output saved to: {save_path}")
     
-    # RETURN THE TWO VALUES PIPELINE.PY EXPECTS
-    return save_path, len(df_summary)
\ No newline at end of file
+    # RETURN (path, template count, stats) FOR PIPELINE.PY
+    return save_path, len(df_summary), {"ruled": ruled, "cached": hits - resumed, "resumed": resumed,
+                                        "reused": len(reuses), "generated": len(new_indices) - failed[0],
+                                        "failed": failed[0], "fallback": fallback, "offline": offline}
\ No newline at end of file
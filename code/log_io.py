@@ -0,0 +1,223 @@
+import os
+import io
+import json
+import hashlib
+import gzip
+import bz2
+import lzma
+
+# zstandard is optional: only needed for .zst archives
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Magic bytes at the start of each supported compressed format
+MAGIC_BYTES = {
+    "gz": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zst": b"\x28\xb5\x2f\xfd",
+}
+
+# Extensions stripped when deriving output names (Linux_2k.log.gz -> Linux_2k.log)
+COMPRESSED_EXTENSIONS = {".gz": "gz", ".bz2": "bz2", ".xz": "xz", ".zst": "zst"}
+
+
+def detect_compression(path):
+    """Returns 'gz', 'bz2', 'xz', 'zst' or None by sniffing the first bytes of the file."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for name, magic in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def split_log_name(path):
+    """
+    Like os.path.splitext, but ignores a trailing compression suffix.
+    'Logs/Linux_2k.log.gz' -> ('Logs/Linux_2k', '.log')
+    """
+    base, ext = os.path.splitext(path)
+    if ext.lower() in COMPRESSED_EXTENSIONS:
+        base, ext = os.path.splitext(base)
+    return base, ext
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("Reading/writing .zst files needs the 'zstandard' package (pip install zstandard).")
+
+
+def open_log(path, mode="r", encoding=None, errors=None, compression=None):
+    """
+    Opens a log file in text mode, transparently handling compression.
+    A 'b' in the mode returns the (de)compressing byte stream instead.
+
+    Reading: compression is detected from the magic bytes, so the file name doesn't matter.
+    Writing: pass compression='gz' | 'bz2' | 'xz' | 'zst' to compress the output (None = plain).
+    """
+    reading = "r" in mode
+    if reading:
+        compression = detect_compression(path)
+    binary = "b" in mode
+    base_mode = mode.replace("t", "").replace("b", "")
+    text_mode = base_mode + "t"
+    if binary:
+        encoding = errors = None
+
+    if compression is None:
+        return open(path, base_mode + ("b" if binary else ""), encoding=encoding, errors=errors)
+    if compression in ("gz", "bz2", "xz"):
+        opener = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}[compression]
+        if binary:
+            return opener(path, base_mode + "b")
+        return opener(path, text_mode, encoding=encoding, errors=errors)
+    if compression == "zst":
+        _require_zstandard()
+        if reading:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            # Appending starts a new frame; concatenated frames decompress as one stream
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, base_mode + "b"), closefd=True)
+        return raw if binary else io.TextIOWrapper(raw, encoding=encoding, errors=errors)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def compressed_name(path, compression):
+    """Appends the extension for 'compression' (if any) to an output path."""
+    return f"{path}.{compression}" if compression else path
+
+
+# ==========================================
+# CHECKPOINTS (incremental / resumable runs)
+# ==========================================
+def checkpoint_path(output_base):
+    """Sidecar file that remembers how far into the input a stage got."""
+    return f"{output_base}.checkpoint.json"
+
+
+def load_checkpoint(path):
+    """Returns the checkpoint dict, or None if missing/unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[CHECKPOINT] Ignoring unreadable checkpoint ({e}).")
+        return None
+
+
+def save_checkpoint(path, data):
+    """Writes the checkpoint atomically (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _last_line_hash(path, offset):
+    """sha256 of the last line ending at byte 'offset' (trailing newline ignored)."""
+    with open(path, "rb") as f:
+        start = max(0, offset - 65536)
+        f.seek(start)
+        tail = f.read(offset - start)
+    last_line = tail.rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+    return hashlib.sha256(last_line).hexdigest()
+
+
+def input_fingerprint(path, offset):
+    """Offset + inode + last-line hash: enough to tell 'file grew' from 'file was replaced'."""
+    return {
+        "offset": offset,
+        "inode": os.stat(path).st_ino,
+        "last_line_hash": _last_line_hash(path, offset),
+    }
+
+
+def resume_offset(path, checkpoint):
+    """
+    Byte offset to continue from, or 0 when a full run is needed
+    (no checkpoint, compressed input, rotated/replaced file, or truncated file).
+    """
+    if not checkpoint or detect_compression(path) is not None:
+        return 0
+    offset = checkpoint.get("offset", 0)
+    stat = os.stat(path)
+    if stat.st_ino != checkpoint.get("inode"):
+        print("[CHECKPOINT] Input was rotated (inode changed). Running a full pass.")
+        return 0
+    if stat.st_size < offset:
+        print("[CHECKPOINT] Input was truncated. Running a full pass.")
+        return 0
+    if _last_line_hash(path, offset) != checkpoint.get("last_line_hash"):
+        print("[CHECKPOINT] Input content changed before the checkpoint. Running a full pass.")
+        return 0
+    return offset
+
+
+def complete_lines_end(path, end=None):
+    """
+    Byte offset just past the last b"\n" before 'end' (default: the file size).
+    A line still being written after it is left for the next incremental run.
+    """
+    end = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as f:
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 65536)
+            f.seek(start)
+            nl = f.read(pos - start).rfind(b"\n")
+            if nl != -1:
+                return start + nl + 1
+            pos = start
+    return 0
+
+
+def at_line_boundary(path, offset):
+    """True if 'offset' is the start of the file or just past a b"\n" (a safe checkpoint)."""
+    if offset == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw reader over [offset, end) of a file (open_log_at with an 'end')."""
+    def __init__(self, path, offset, end):
+        self._file = open(path, "rb")
+        self._file.seek(offset)
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        remaining = self._end - self._file.tell()
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:remaining]
+        return self._file.readinto(view)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_log_at(path, offset=0, encoding=None, errors=None, end=None):
+    """
+    Opens a PLAIN log file in text mode starting at byte 'offset' (up to byte 'end', if given).
+    After reading, f.buffer.tell() is the byte offset that was reached.
+    """
+    if end is not None:
+        binfile = io.BufferedReader(_BoundedReader(path, offset, end))
+    else:
+        binfile = open(path, "rb")
+        binfile.seek(offset)
+    return io.TextIOWrapper(binfile, encoding=encoding, errors=errors)
@@ -0,0 +1,214 @@
+from drain3 import TemplateMiner
+from drain3.masking import LogMasker
+
+# ==========================================
+# FUSED MASKING ENGINE
+# ==========================================
+# Drain3's LogMasker runs every MaskingInstruction's re.sub() on every line, in order.
+# FusedMasker keeps that exact order (later rules see the output of earlier ones, so
+# they can't be merged into one alternation without changing the result), but first
+# checks literals that any match MUST contain. A plain substring test is far cheaper
+# than a regex scan, so most rules are skipped on most lines.
+
+def _skip_quantifier(pattern, i):
+    """
+    Consumes a quantifier at pattern[i] (plus a lazy/possessive '?'/'+').
+    Returns (next_i, kind): kind is None (no quantifier), 'plus' (1 or more) or 'optional'.
+    """
+    if i >= len(pattern) or pattern[i] not in "?*+{":
+        return i, None
+    kind = "plus" if pattern[i] == "+" else "optional"
+    if pattern[i] == "{":
+        end = pattern.find("}", i)
+        if end == -1:
+            return i, None # A literal '{'
+        i = end + 1
+    else:
+        i += 1
+    if i < len(pattern) and pattern[i] in "?+":
+        i += 1
+    return i, kind
+
+
+def _skip_class(pattern, i):
+    """pattern[i] == '[': returns the index just after the closing ']'."""
+    j = i + 1
+    if j < len(pattern) and pattern[j] == "^": j += 1
+    if j < len(pattern) and pattern[j] == "]": j += 1
+    while j < len(pattern) and pattern[j] != "]":
+        j += 2 if pattern[j] == "\\" else 1
+    return j + 1
+
+
+def _group_end(pattern, i):
+    """pattern[i] == '(': returns the index of the matching ')'."""
+    depth = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(pattern)
+
+
+def _split_alternatives(pattern):
+    """Top-level '|' branches of a pattern."""
+    branches, start, i = [], 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+        elif ch == "[":
+            i = _skip_class(pattern, i)
+        elif ch == "(":
+            i = _group_end(pattern, i) + 1
+        else:
+            if ch == "|":
+                branches.append(pattern[start:i])
+                start = i + 1
+            i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _class_literals(body):
+    """'[<>=!]' -> ('<', '>', '=', '!'); () for negated classes, ranges or escapes."""
+    if not body or body[0] == "^" or "-" in body or "\\" in body:
+        return ()
+    return tuple(dict.fromkeys(body))
+
+
+def _sequence_literals(seq):
+    """Best guard of one alternation branch (see required_literals)."""
+    candidates, current = [], []
+    def flush():
+        if current:
+            candidates.append(("".join(current),))
+            current.clear()
+
+    i = 0
+    while i < len(seq):
+        ch = seq[i]
+        if ch == "(":
+            end = _group_end(seq, i)
+            body = seq[i + 1:end]
+            i, kind = _skip_quantifier(seq, end + 1)
+            flush()
+            if kind == "optional":
+                continue
+            if body.startswith("?:"):
+                body = body[2:]
+            elif body.startswith("?P<"):
+                body = body[body.index(">") + 1:]
+            elif body.startswith("?"):
+                continue # Lookaround: requires nothing to be consumed
+            alternatives = required_literals(body)
+            if alternatives:
+                candidates.append(alternatives)
+            continue
+        if ch == "[":
+            end = _skip_class(seq, i)
+            chars = _class_literals(seq[i + 1:end - 1])
+            i, kind = _skip_quantifier(seq, end)
+            flush()
+            if kind != "optional" and chars:
+                candidates.append(chars)
+            continue
+        if ch == "\\":
+            nxt = seq[i + 1:i + 2]
+            i += 2
+            if not nxt or nxt.isalnum():
+                # \\d, \\s, \\b, \\1 ...: not a literal
+                i, _ = _skip_quantifier(seq, i)
+                flush()
+                continue
+            literal = nxt # Escaped punctuation ('\\(', '\\.', '\\ ')
+        elif ch in ".^$":
+            i, _ = _skip_quantifier(seq, i + 1)
+            flush()
+            continue
+        else:
+            literal = ch
+            i += 1
+
+        i, kind = _skip_quantifier(seq, i)
+        if kind == "optional":
+            flush()
+            continue
+        current.append(literal)
+        if kind == "plus":
+            flush()
+    flush()
+    if not candidates:
+        return ()
+    # Prefer long literals, then fewer alternatives
+    return max(candidates, key=lambda alts: (min(map(len, alts)), -len(alts)))
+
+
+def required_literals(pattern):
+    """
+    Literals of which every match of 'pattern' must contain AT LEAST ONE, or () if unknown.
+    Conservative: escapes like \\d, negated classes and optional parts never count,
+    lookarounds are skipped, and inline flags disable the guard.
+    """
+    if any(f"(?{flag}" in pattern for flag in "aiLmsux"):
+        return ()
+    alternatives = []
+    for branch in _split_alternatives(pattern):
+        literals = _sequence_literals(branch)
+        if not literals:
+            return ()
+        alternatives.extend(literals)
+    return tuple(dict.fromkeys(alternatives))
+
+
+class FusedMasker(LogMasker):
+    """
+    Drop-in LogMasker: same instructions, same order, same output, but each rule
+    is gated by its required literals. Install with new_template_miner().
+    """
+    def __init__(self, masking_instructions, mask_prefix, mask_suffix):
+        super().__init__(masking_instructions, mask_prefix, mask_suffix)
+        self.rules = []
+        for mi in masking_instructions:
+            regex = getattr(mi, "regex", None)
+            if regex is None:
+                # Custom instruction type: no guard, let it mask as usual
+                self.rules.append((None, None, mi))
+                continue
+            mask = mask_prefix + mi.mask_with + mask_suffix
+            literals = required_literals(regex.pattern)
+            # One literal -> plain 'in' test; several -> any of them; none -> always run
+            guard = literals[0] if len(literals) == 1 else (literals or None)
+            self.rules.append((guard, regex.sub, mask))
+
+    def mask(self, content):
+        for guard, sub, mask in self.rules:
+            if guard is not None:
+                if guard.__class__ is str:
+                    if guard not in content:
+                        continue
+                elif not any(literal in content for literal in guard):
+                    continue
+            if sub is None:
+                content = mask.mask(content, self.mask_prefix, self.mask_suffix)
+            else:
+                content = sub(mask, content)
+        return content
+
+
+def new_template_miner(config):
+    """TemplateMiner with the fused masker installed (identical templates, faster masking)."""
+    template_miner = TemplateMiner(config=config)
+    template_miner.masker = FusedMasker(config.masking_instructions, config.mask_prefix, config.mask_suffix)
+    return template_miner
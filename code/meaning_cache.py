@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+# ==========================================
+# TEMPLATE MEANING CACHE (SQLite)
+# ==========================================
+# One row per (template, model, prompt hash), so a meaning is only reused for the
+# model and prompt that produced it. WAL mode lets other sessions keep reading
+# while one writes. New meanings are checkpointed in small transactions while a
+# file is processed, and a job row per file records how far generation got, so a
+# crashed or cancelled run resumes where it stopped.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meanings (
+    template    TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    meaning     TEXT NOT NULL,
+    created     REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (template, model, prompt_hash)
+);
+CREATE INDEX IF NOT EXISTS meanings_last_used ON meanings (last_used);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key     TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    total       INTEGER NOT NULL,
+    done        INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    started     REAL NOT NULL,
+    updated     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Least recently used rows beyond this are evicted (all models / prompts together)
+MAX_CACHE_ENTRIES = int(os.environ.get("LLAMA_CACHE_MAX_ENTRIES", "100000"))
+
+# Eviction runs every N upserts instead of after each one
+EVICT_EVERY = 256
+
+# New meanings are written every N templates or T seconds, whichever comes first
+# (and on close); a crash loses at most that much work
+CHECKPOINT_EVERY = int(os.environ.get("LLAMA_CHECKPOINT_EVERY", "10"))
+CHECKPOINT_SECONDS = float(os.environ.get("LLAMA_CHECKPOINT_SECONDS", "5"))
+
+UPSERT_SQL = ("INSERT INTO meanings (template, model, prompt_hash, meaning, created, last_used) "
+              "VALUES (?, ?, ?, ?, ?, ?) "
+              "ON CONFLICT (template, model, prompt_hash) DO UPDATE SET "
+              "meaning = excluded.meaning, last_used = excluded.last_used")
+
+# Templates per 'IN (...)' lookup (SQLite caps the number of bound variables)
+LOOKUP_CHUNK = 500
+
+
+def prompt_hash(*parts):
+    """Short, stable hash of the prompt text(s) a meaning was generated with."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class MeaningCache:
+    """
+    Meanings of (template, model, prompt_key) in a SQLite file.
+    get_many() looks templates up and marks them as used; put() queues one meaning
+    and checkpoint() writes the queue (put() calls it every checkpoint_every
+    templates / checkpoint_seconds). start_job() / finish_job() track one file.
+    """
+    def __init__(self, path, model, prompt_key, max_entries=MAX_CACHE_ENTRIES,
+                 checkpoint_every=CHECKPOINT_EVERY, checkpoint_seconds=CHECKPOINT_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.model = model
+        self.prompt_key = prompt_key
+        self.max_entries = max_entries
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.job_key = None
+        self._pending = []
+        self._last_checkpoint = time.monotonic()
+        self._puts = 0
+        # Autocommit outside the explicit checkpoint transactions; wait on a busy writer instead of failing
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __len__(self):
+        """Meanings stored for this model + prompt."""
+        return self.conn.execute("SELECT COUNT(*) FROM meanings WHERE model = ? AND prompt_hash = ?",
+                                 (self.model, self.prompt_key)).fetchone()[0]
+
+    def get_many(self, templates):
+        """Returns {template: meaning} for the templates that are cached."""
+        templates = list(dict.fromkeys(templates))
+        found = {}
+        now = time.time()
+        for start in range(0, len(templates), LOOKUP_CHUNK):
+            chunk = templates[start:start + LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            params = (self.model, self.prompt_key, *chunk)
+            rows = self.conn.execute(
+                f"SELECT template, meaning FROM meanings WHERE model = ? AND prompt_hash = ? AND template IN ({marks})",
+                params).fetchall()
+            found.update(rows)
+            if rows:
+                self.conn.execute(
+                    f"UPDATE meanings SET last_used = ? WHERE model = ? AND prompt_hash = ? AND template IN ({marks})",
+                    (now, *params))
+        return found
+
+    def items(self):
+        """All (template, meaning) pairs stored for this model + prompt."""
+        return self.conn.execute("SELECT template, meaning FROM meanings WHERE model = ? AND prompt_hash = ?",
+                                 (self.model, self.prompt_key)).fetchall()
+
+    def put(self, template, meaning):
+        """Queues the meaning of one template; checkpoints when the queue is due."""
+        self._pending.append((template, meaning))
+        if (len(self._pending) >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Upserts the queued meanings and advances the job, in one transaction. Returns how many."""
+        self._last_checkpoint = time.monotonic()
+        if not self._pending:
+            return 0
+        now = time.time()
+        rows = [(template, self.model, self.prompt_key, meaning, now, now) for template, meaning in self._pending]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(UPSERT_SQL, rows)
+            if self.job_key:
+                self.conn.execute("UPDATE jobs SET done = done + ?, updated = ? WHERE job_key = ?",
+                                  (len(rows), now, self.job_key))
+        self._pending = []
+        before = self._puts
+        self._puts += len(rows)
+        if self._puts // EVICT_EVERY > before // EVICT_EVERY:
+            self.evict()
+        return len(rows)
+
+    def start_job(self, source, templates):
+        """
+        Starts (or resumes) the job for this set of templates. Returns how many
+        meanings an unfinished earlier run of the same job already saved.
+        """
+        self.job_key = prompt_hash(self.model, self.prompt_key, *sorted(set(templates)))
+        row = self.conn.execute("SELECT done, status FROM jobs WHERE job_key = ?", (self.job_key,)).fetchone()
+        resumed = row[0] if row and row[1] != "complete" else 0
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO jobs (job_key, source, model, prompt_hash, total, done, status, started, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'running', ?, ?) "
+            "ON CONFLICT (job_key) DO UPDATE SET source = excluded.source, total = excluded.total, "
+            "done = excluded.done, status = 'running', updated = excluded.updated",
+            (self.job_key, source, self.model, self.prompt_key, len(templates), resumed, now, now))
+        return resumed
+
+    def finish_job(self, status="complete"):
+        """Checkpoints and marks the current job 'complete' (or 'interrupted')."""
+        self.checkpoint()
+        if self.job_key:
+            self.conn.execute("UPDATE jobs SET status = ?, updated = ? WHERE job_key = ?",
+                              (status, time.time(), self.job_key))
+            self.job_key = None
+
+    def evict(self):
+        """Drops the least recently used rows beyond max_entries. Returns how many."""
+        excess = self.conn.execute("SELECT COUNT(*) FROM meanings").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute("DELETE FROM meanings WHERE rowid IN "
+                          "(SELECT rowid FROM meanings ORDER BY last_used LIMIT ?)", (excess,))
+        return excess
+
+    def import_json(self, json_path):
+        """
+        One-time import of the old {template: meaning} JSON cache under this model
+        and prompt. Existing rows win. Returns the number of rows added (0 if this
+        file was imported before).
+        """
+        key = f"json_import:{os.path.abspath(json_path)}"
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        now = time.time()
+        rows = [(str(t).strip(), self.model, self.prompt_key, str(m), now, now) for t, m in data.items()]
+        with self.conn: # One transaction for the whole import
+            self.conn.execute("BEGIN")
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO meanings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(added)))
+        return added
+
+    def close(self):
+        """Saves what is queued (a job still running at this point was interrupted) and closes."""
+        self.finish_job("interrupted")
+        self.evict()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,76 @@
+import os
+import json
+import time
+
+# ==========================================
+# PARSE-STAGE INSTRUMENTATION
+# ==========================================
+# Wall time of parse_log_file split into phases, plus template growth over the
+# input. Returned to the UI and saved next to the artifact as '<base>_analysis.stats.json'.
+PARSE_PHASES = ("read", "preprocess", "mining", "extraction", "write")
+
+# Template growth is sampled every N lines; when the list gets longer than
+# MAX_GROWTH_SAMPLES, every other sample is dropped and N doubles
+GROWTH_SAMPLE_LINES = 1000
+MAX_GROWTH_SAMPLES = 200
+
+
+def stats_path(output_base):
+    """Sidecar with the timings of the last run of a stage."""
+    return f"{output_base}.stats.json"
+
+
+class ParseStats:
+    """
+    lap(phase) charges the time since the previous lap to 'phase', so the phases
+    always add up to the wall time. sample() records (lines, templates, seconds).
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._mark = self.started
+        self.phases = dict.fromkeys(PARSE_PHASES, 0.0)
+        self.growth = []
+        self.sample_every = GROWTH_SAMPLE_LINES
+        self.lines = 0
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] += now - self._mark
+        self._mark = now
+
+    def count_line(self, templates_fn):
+        """
+        Call once per parsed line; templates_fn() gives the current template count
+        (None when templates only exist at the end, e.g. sharded mining).
+        """
+        self.lines += 1
+        if templates_fn is not None and self.lines % self.sample_every == 0:
+            self.sample(templates_fn())
+
+    def sample(self, templates):
+        self.growth.append({"lines": self.lines, "templates": templates,
+                            "seconds": round(time.perf_counter() - self.started, 3)})
+        if len(self.growth) > MAX_GROWTH_SAMPLES:
+            self.growth = self.growth[1::2]
+            self.sample_every *= 2
+
+    def result(self, **info):
+        """Structured summary: info (input, mode, templates, ...) + phases + throughput."""
+        total = time.perf_counter() - self.started
+        return {
+            **info,
+            "lines": self.lines,
+            "seconds": round(total, 3),
+            "lines_per_sec": round(self.lines / total, 1) if total > 0 else 0.0,
+            "phases": {phase: round(seconds, 3) for phase, seconds in self.phases.items()},
+            "template_growth": self.growth,
+        }
+
+
+def save_stats(path, stats):
+    """Writes the stats sidecar (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
@@ -1,14 +1,29 @@
 import re
-import json
 import os
+import base64
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from drain3 import TemplateMiner
 from drain3.template_miner_config import TemplateMinerConfig
 from drain3.masking import MaskingInstruction
+from drain3.memory_buffer_persistence import MemoryBufferPersistence
+from drain3.file_persistence import FilePersistence
+from masking_engine import new_template_miner
+from parse_stats import ParseStats, stats_path, save_stats
+from syslog_header import tokenize_header, YearInference, header_parts, resolve_header_parts
+from artifact_store import (artifact_path, write_sheets, read_sheet, export_excel, SheetStreamWriter,
+                            LINE_INDEX_COLUMN, apply_parameter_dtypes, order_log_columns)
+from log_io import (open_log, open_log_at, detect_compression, split_log_name,
+                    checkpoint_path, load_checkpoint, save_checkpoint, input_fingerprint, resume_offset,
+                    complete_lines_end, at_line_boundary)
 
 # ==========================================
 # 1. SETUP + CONFIGURATION
 # ==========================================
+# Warm-start miner snapshots live next to the meaning cache
+STATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
+
 def get_miner_config():
     config = TemplateMinerConfig()
     config.profiling_enabled = False
@@ -68,21 +83,88 @@ def get_miner_config():
 ]
     return config
 
+def export_miner_state(template_miner):
+    """Serializes the Drain3 tree using Drain3's own snapshot format (base64 text)."""
+    handler = MemoryBufferPersistence()
+    template_miner.persistence_handler = handler
+    try:
+        template_miner.save_state("checkpoint")
+    finally:
+        # Detach again, otherwise Drain3 snapshots on every new cluster
+        template_miner.persistence_handler = None
+    return base64.b64encode(handler.state).decode("ascii")
+
+def import_miner_state(template_miner, state_text):
+    """Restores a tree produced by export_miner_state() into 'template_miner'."""
+    handler = MemoryBufferPersistence()
+    handler.state = base64.b64decode(state_text)
+    template_miner.persistence_handler = handler
+    try:
+        template_miner.load_state()
+    finally:
+        template_miner.persistence_handler = None
+
+def miner_state_path(config, state_dir=STATE_DIR):
+    """
+    Snapshot file for the persistent miner. The name includes a hash of the
+    masking/tree settings, so editing get_miner_config() starts a fresh tree.
+    """
+    settings = [config.drain_depth, config.drain_sim_th, config.mask_prefix, config.mask_suffix]
+    settings += [(m.pattern, m.mask_with) for m in config.masking_instructions]
+    digest = hashlib.sha256(repr(settings).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(state_dir, f"drain3_state_{digest}.bin")
+
+def load_persistent_state(template_miner, state_file):
+    """Warm-starts 'template_miner' from a FilePersistence snapshot. Returns True if loaded."""
+    if not os.path.exists(state_file):
+        return False
+    template_miner.persistence_handler = FilePersistence(state_file)
+    try:
+        template_miner.load_state()
+    except Exception as e:
+        print(f"[MINER] Ignoring unreadable state file ({e}). Starting fresh.")
+        return False
+    finally:
+        template_miner.persistence_handler = None
+    return True
+
+def save_persistent_state(template_miner, state_file):
+    """Writes the tree with FilePersistence (temp file + rename, so a crash can't corrupt it)."""
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    tmp_file = f"{state_file}.tmp"
+    template_miner.persistence_handler = FilePersistence(tmp_file)
+    try:
+        template_miner.save_state("warm start")
+    finally:
+        template_miner.persistence_handler = None
+    os.replace(tmp_file, state_file)
+
 # ==========================================
 # 2. HELPER FUNCTIONS
 # ==========================================
+# Precompiled normalization patterns (each guarded by a literal it can't match without)
+TRAILING_TIMESTAMP_PATTERN = re.compile(r"\s+at\s+\w{3}\s+\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4}$")
+LOGIN_UID_PATTERN = re.compile(r"\b\w+\(uid=")
+FTPD_RHOST_PATTERN = re.compile(r"(connection from)\s+(\d{1,3}(?:\.\d{1,3}){3})\s*\(([^)]*)\)")
+# Header of the cleaned raw line: ^(Jun 18 20:20:20) (combo) ...
+HEADER_PATTERN = re.compile(r'^([A-Z][a-z]{2}\s+\d+\s\d{2}:\d{2}:\d{2})\s+(\S+)')
+
 def remove_trailing_timestamp(text):
     """
     Removes the redundant 'at Sat Jun 18...' timestamp from the end of the line.
     """
     # Regex for: " at Sat Jun 18 02:08:12 2005" (at the end of string)
-    return re.sub(r"\s+at\s+\w{3}\s+\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4}$", "", text)
+    if "at" not in text:
+        return text
+    return TRAILING_TIMESTAMP_PATTERN.sub("", text)
 
 def normalize_login_uid(line):
     """
     Standardizes 'LOGIN(uid=0)' to just '(uid=0)' so it matches the template consistently.
     """
-    return re.sub(r"\b\w+\(uid=", "(uid=", line)
+    if "(uid=" not in line:
+        return line
+    return LOGIN_UID_PATTERN.sub("(uid=", line)
 
 def preprocess_log(log_line):
     # 1. Remove the redundant trailing timestamp first
@@ -90,24 +172,39 @@ def preprocess_log(log_line):
     log_line = normalize_ftpd_rhost(log_line)
     
     # 2. Standardize the Header
-    header_regex = r'^([A-Z][a-z]{2}\s+\d+\s\d{2}:\d{2}:\d{2})\s+(\S+)'
-    log_line = re.sub(header_regex, '<TIMESTAMP> <HOSTNAME>', log_line)
+    log_line = HEADER_PATTERN.sub('<TIMESTAMP> <HOSTNAME>', log_line)
     return log_line.strip()
 
+def _rhost_replacer(match):
+    prefix, outer_ip, inner = match.group(1), match.group(2), match.group(3).strip()
+    return f"{prefix} {outer_ip} ({inner})" if inner else f"{prefix} {outer_ip}"
+
 def normalize_ftpd_rhost(line):
-    pattern = re.compile(r"(connection from)\s+(\d{1,3}(?:\.\d{1,3}){3})\s*\(([^)]*)\)")
-    def replacer(match):
-        prefix, outer_ip, inner = match.group(1), match.group(2), match.group(3).strip()
-        return f"{prefix} {outer_ip} ({inner})" if inner else f"{prefix} {outer_ip}"
-    return pattern.sub(replacer, line)
+    if "connection from" not in line:
+        return line
+    return FTPD_RHOST_PATTERN.sub(_rhost_replacer, line)
 
-def extract_named_parameters(clean_raw_line, template, line_index):
+def normalize_line(raw_line):
     """
-    Extracts values using the Cleaned Raw Line (no trailing timestamp).
+    One pass over a raw line: returns (content for Drain3, cleaned raw line for extraction).
+    Same result as (preprocess_log(raw_line), prepare_raw_line(raw_line)), but the
+    trailing timestamp is only stripped once.
+    """
+    stripped = remove_trailing_timestamp(raw_line)
+    content = HEADER_PATTERN.sub('<TIMESTAMP> <HOSTNAME>', normalize_ftpd_rhost(stripped)).strip()
+    clean_raw_line = normalize_ftpd_rhost(normalize_login_uid(stripped))
+    return content, clean_raw_line
+
+TAG_PATTERN = re.compile(r"<[A-Z]+>")
+
+# Max templates kept in the extractor cache (a log rarely has more than a few hundred)
+EXTRACTOR_CACHE_SIZE = 4096
+
+def build_template_extractor(template):
+    """
+    Turns a Drain3 template into (compiled_regex, ordered_tags).
+    compiled_regex is None if the template doesn't produce a valid pattern.
     """
-    params = {}
-    
-    # --- PART A: Existing Template Matching Logic ---
     regex_pattern = re.escape(template)
 
     # Allow flexible whitespace
@@ -128,122 +225,661 @@ def extract_named_parameters(clean_raw_line, template, line_index):
             regex_pattern = regex_pattern.replace(re.escape(tag), pattern)
 
     # Replace remaining generic tags
-    remaining_tags = re.findall(r"<[A-Z]+>", template)
-    for tag in set(remaining_tags):
+    ordered_tags = TAG_PATTERN.findall(template)
+    for tag in set(ordered_tags):
         if tag not in special_tags:
             regex_pattern = regex_pattern.replace(re.escape(tag), r"(.*?)")
 
-    regex_pattern = f"^{regex_pattern}$"
-
     try:
-        match = re.match(regex_pattern, clean_raw_line)
-        if match:
-            extracted_values = list(match.groups())
-            ordered_tags = re.findall(r"<[A-Z]+>", template)
-            
-            if len(extracted_values) == len(ordered_tags):
-                 for tag, value in zip(ordered_tags, extracted_values):
-                    key = tag.strip("<>")
-                    if value is None: value = ""
-                    
-                    if key in params:
-                        params[key] = f"{params[key]}, {value}"
-                    else:
-                        params[key] = value
-    except Exception:
-        pass
+        compiled = re.compile(f"^{regex_pattern}$")
+    except re.error:
+        compiled = None
+    return compiled, [tag.strip("<>") for tag in ordered_tags]
+
+
+class TemplateExtractorCache:
+    """
+    Bounded LRU cache: template string -> (compiled regex, ordered tag names).
+    Entries are evicted when Drain3 rewrites a cluster's template, since the old
+    template string will not be produced again.
+    """
+    def __init__(self, max_size=EXTRACTOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, template):
+        entry = self._entries.get(template)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(template)
+            return entry
+        self.misses += 1
+        entry = build_template_extractor(template)
+        self._entries[template] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def evict(self, template):
+        if self._entries.pop(template, None) is not None:
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Max distinct lines remembered by each level of the dedup cache
+DEDUP_CACHE_SIZE = 100_000
+
+class ContentDedupCache:
+    """
+    Bounded LRU in front of the miner, two levels:
+      * preprocessed content -> cluster + extracted params (skips masking, Drain3 and extraction)
+      * masked content       -> cluster                    (skips the Drain3 tree search)
+    A hit bumps the cluster's size by hand, exactly as Drain3 does on a match.
+    Drain3 only changes its tree/templates when it creates or generalizes a cluster,
+    so both levels are cleared whenever that happens: a hit then always gives the
+    cluster Drain3 itself would have picked.
+    """
+    def __init__(self, max_size=DEDUP_CACHE_SIZE):
+        self.max_size = max_size
+        self._lines = OrderedDict()
+        self._masked = OrderedDict()
+        self.line_hits = 0
+        self.masked_hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    @staticmethod
+    def _get(entries, key):
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+        return entry
+
+    def _put(self, entries, key, entry):
+        entries[key] = entry
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def lookup(self, content):
+        """Level 1: (cluster_id, template, params) for a repeated preprocessed line, else None."""
+        entry = self._get(self._lines, content)
+        if entry is None:
+            return None
+        cluster, template, params = entry
+        cluster.size += 1
+        self.line_hits += 1
+        return cluster.cluster_id, template, params
+
+    def lookup_masked(self, masked):
+        """Level 2: (cluster_id, template) for a repeated masked line, else None."""
+        entry = self._get(self._masked, masked)
+        if entry is None:
+            self.misses += 1
+            return None
+        cluster, template = entry
+        cluster.size += 1
+        self.masked_hits += 1
+        return cluster.cluster_id, template
+
+    def store(self, content, masked, cluster, template, change_type):
+        if change_type != "none":
+            # The tree or a template changed: earlier answers may no longer hold
+            if self._lines or self._masked:
+                self.resets += 1
+            self._lines.clear()
+            self._masked.clear()
+        self._put(self._masked, masked, (cluster, template))
+        self._put(self._lines, content, (cluster, template, None))
+
+    def attach_parameters(self, content, params):
+        """Caches the extraction result of the line just mined."""
+        entry = self._lines.get(content)
+        if entry is not None:
+            self._lines[content] = entry[:2] + (params,)
+
+    def stats(self):
+        hits = self.line_hits + self.masked_hits
+        total = hits + self.misses
+        return {
+            "line_hits": self.line_hits,
+            "masked_hits": self.masked_hits,
+            "misses": self.misses,
+            "resets": self.resets,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+def mine_content(template_miner, content, dedup=None):
+    """
+    add_log_message() behind the dedup cache.
+    Returns (cluster_id, template, change_type, cached_params); cached_params is None
+    unless the exact same preprocessed line was already extracted.
+    """
+    if dedup is None:
+        result = template_miner.add_log_message(content)
+        return result['cluster_id'], result['template_mined'], result['change_type'], None
+
+    cached = dedup.lookup(content)
+    if cached is not None:
+        cluster_id, template, params = cached
+        return cluster_id, template, "none", params
+
+    masked = template_miner.masker.mask(content)
+    cached = dedup.lookup_masked(masked)
+    if cached is not None:
+        cluster_id, template = cached
+        return cluster_id, template, "none", None
+
+    # Same as TemplateMiner.add_log_message(), minus the second masking pass
+    cluster, change_type = template_miner.drain.add_log_message(masked)
+    template = cluster.get_template()
+    dedup.store(content, masked, cluster, template, change_type)
+    return cluster.cluster_id, template, change_type, None
+
+
+def reuse_parameters(cached_params, clean_raw_line, line_index):
+    """Parameters of a repeated line: same body values, this line's own header + index."""
+    params = dict(cached_params)
+    header_match = HEADER_PATTERN.search(clean_raw_line)
+    if header_match:
+        params['TIMESTAMP'] = header_match.group(1)
+        params['HOSTNAME'] = header_match.group(2)
+    params[LINE_INDEX_COLUMN] = line_index
+    return params
+
+
+def extract_named_parameters(clean_raw_line, template, line_index, cache=None):
+    """
+    Extracts values using the Cleaned Raw Line (no trailing timestamp).
+    Returns {tag: value, ..., 'Line Index': line_index} (one typed column per key later on).
+    Pass a TemplateExtractorCache to reuse the compiled pattern across lines.
+    """
+    params = {}
+    
+    # --- PART A: Existing Template Matching Logic ---
+    if cache is not None:
+        compiled, ordered_tags = cache.get(template)
+    else:
+        compiled, ordered_tags = build_template_extractor(template)
+
+    match = compiled.match(clean_raw_line) if compiled is not None else None
+    if match:
+        extracted_values = match.groups()
+        
+        if len(extracted_values) == len(ordered_tags):
+            for key, value in zip(ordered_tags, extracted_values):
+                if value is None: value = ""
+                
+                if key in params:
+                    params[key] = f"{params[key]}, {value}"
+                else:
+                    params[key] = value
 
     # --- PART B: FIX - Force Header Extraction ---
     # We manually extract the TIMESTAMP and HOSTNAME from the raw line 
     # to ensure they are always captured correctly, regardless of template matching.
-    
-    # This Regex matches: ^(Jun 18 20:20:20) (combo) ...
-    header_match = re.search(r'^([A-Z][a-z]{2}\s+\d+\s\d{2}:\d{2}:\d{2})\s+(\S+)', clean_raw_line)
+    header_match = HEADER_PATTERN.search(clean_raw_line)
     
     if header_match:
         # Overwrite/Set these keys with the authoritative raw values
         params['TIMESTAMP'] = header_match.group(1)
         params['HOSTNAME'] = header_match.group(2)
     
-    params['_Original_Line_Index'] = line_index
+    params[LINE_INDEX_COLUMN] = line_index
+
+    return params
+
+def prepare_raw_line(raw_line):
+    """Cleaned Raw Line used for extraction (same normalizations as the template side)."""
+    clean_raw_line = remove_trailing_timestamp(raw_line)
+    clean_raw_line = normalize_login_uid(clean_raw_line)
+    return normalize_ftpd_rhost(clean_raw_line)
+
+# ==========================================
+# 3. TWO-PHASE EXTRACTION (final templates)
+# ==========================================
+# Lines per phase-two task (big clusters are split so the pool stays busy)
+EXTRACT_BATCH_SIZE = 20000
+
+def _extract_batch(task):
+    """Worker: extracts parameters for one batch of lines sharing the same final template."""
+    template, lines = task
+    cache = TemplateExtractorCache(max_size=1)
+    return [extract_named_parameters(prepare_raw_line(raw_line), template, idx, cache=cache)
+            for idx, raw_line in lines]
+
+def extract_against_final_templates(template_miner, rows, line_indices, workers=1):
+    """
+    Phase two: groups the mined rows by cluster and extracts parameters against each
+    cluster's FINAL template, one compiled pattern per batch. Fills the
+    'Drained Named Log' and 'Parameters' columns of 'rows' in place.
+    """
+    final_templates = {c.cluster_id: c.get_template() for c in template_miner.drain.clusters}
+
+    groups = {}
+    for pos, row in enumerate(rows):
+        groups.setdefault(row["Template ID"], []).append(pos)
+
+    tasks, task_positions = [], []
+    for cluster_id, positions in groups.items():
+        template = final_templates[cluster_id]
+        for i in range(0, len(positions), EXTRACT_BATCH_SIZE):
+            batch = positions[i:i + EXTRACT_BATCH_SIZE]
+            tasks.append((template, [(line_indices[pos], rows[pos]["Raw Log"]) for pos in batch]))
+            task_positions.append(batch)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_extract_batch, tasks))
+    else:
+        results = [_extract_batch(task) for task in tasks]
 
-    return json.dumps(params)
+    for (template, _), batch, params in zip(tasks, task_positions, results):
+        for pos, row_params in zip(batch, params):
+            rows[pos]["Drained Named Log"] = template
+            rows[pos]["Parameters"] = row_params
+
+    print(f"[TWO-PHASE] Extracted {len(rows)} lines in {len(tasks)} batches "
+          f"against {len(groups)} final templates ({workers} worker(s)).")
+
+# ==========================================
+# 4. SHARDED MINING (one Drain3 tree per service)
+# ==========================================
+def _mine_services(task):
+    """
+    Worker: mines each service of the task with its OWN miner, then extracts
+    parameters against that miner's final templates.
+    Returns {service: (local_cluster_ids, params_dicts, [(local_id, template), ...])}.
+    """
+    results = {}
+    for service, lines in task:
+        template_miner = new_template_miner(get_miner_config())
+        dedup = ContentDedupCache()
+        local_ids = [mine_content(template_miner, preprocess_log(raw_line), dedup)[0]
+                     for _, raw_line in lines]
+        final_templates = {c.cluster_id: c.get_template() for c in template_miner.drain.clusters}
+
+        cache = TemplateExtractorCache()
+        params = [extract_named_parameters(prepare_raw_line(raw_line), final_templates[cid], idx, cache=cache)
+                  for (idx, raw_line), cid in zip(lines, local_ids)]
+        results[service] = (local_ids, params, sorted(final_templates.items()))
+    return results
+
+def _balance_shards(shards, workers):
+    """Greedy bin packing: biggest services first, each into the least-loaded bin."""
+    bins = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for service in sorted(shards, key=lambda name: len(shards[name]), reverse=True):
+        target = loads.index(min(loads))
+        bins[target].append((service, shards[service]))
+        loads[target] += len(shards[service])
+    return [b for b in bins if b]
+
+def mine_sharded(rows, line_indices, services, workers=1):
+    """
+    Routes every row (services[pos]: its header's service) to a per-service miner and runs the shards in worker processes.
+    Local cluster ids are shifted by a per-service offset (services in order of first
+    appearance), so the final Template IDs stay globally unique.
+    Fills 'rows' in place and returns [(template_id, template), ...].
+    """
+    shards = {}
+    positions = {}
+    for pos, (row, service) in enumerate(zip(rows, services)):
+        shards.setdefault(service, []).append((line_indices[pos], row["Raw Log"]))
+        positions.setdefault(service, []).append(pos)
+
+    workers = min(workers or os.cpu_count() or 1, len(shards))
+    tasks = _balance_shards(shards, workers)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = {}
+            for part in pool.map(_mine_services, tasks):
+                results.update(part)
+    else:
+        results = _mine_services(tasks[0])
+
+    templates = []
+    offset = 0
+    for service in shards: # first-appearance order
+        local_ids, params, local_templates = results[service]
+        final = dict(local_templates)
+        for pos, cid, row_params in zip(positions[service], local_ids, params):
+            rows[pos]["Template ID"] = offset + cid
+            rows[pos]["Drained Named Log"] = final[cid]
+            rows[pos]["Parameters"] = row_params
+        templates.extend((offset + cid, template) for cid, template in local_templates)
+        offset += max(final)
+
+    print(f"[SHARD] Mined {len(rows)} lines in {len(shards)} service shards "
+          f"({workers} worker(s)).")
+    return templates
 
 # ==========================================
-# 3. MAIN PARSING FUNCTION
+# 5. MAIN PARSING FUNCTION
 # ==========================================
-def parse_log_file(target_file):
+# Rows per spilled batch in streaming mode (memory stays around one batch)
+STREAM_BATCH_SIZE = 50_000
+# Inputs at least this big are parsed in streaming mode by the pipeline
+STREAM_MIN_BYTES = 256 * 1024 * 1024
+
+def rows_frame(rows, headers, year_offsets):
     """
-    Parses the given log file using Drain3 and exports to Excel.
-    Returns: (output_excel_path, total_lines, unique_clusters)
+    Parsed rows -> 'Log Analysis' columns: Raw Log, Drained Named Log, Template ID, one column
+    per parameter, Service / Service PID and the raw header time fields (see resolve_header_parts).
+    """
+    df_logs = pd.DataFrame(rows, columns=["Raw Log", "Drained Named Log", "Template ID"])
+    df_params = pd.DataFrame.from_records([row["Parameters"] for row in rows], index=df_logs.index)
+    df_header = header_parts(headers, year_offsets, index=df_logs.index)
+    return pd.concat([df_logs, df_params, df_header], axis=1)
+
+def parse_log_file(target_file, resume=False, two_phase=False, workers=1, persist_state=False, state_file=None,
+                   sharded=False, excel=False, stream=False):
+    """
+    Parses the given log file using Drain3 and writes a '_analysis.artifact'
+    (Parquet sheets 'Log Analysis' + 'Template Summary'; excel=True also exports an .xlsx copy).
+    Compressed inputs (.gz/.bz2/.xz/.zst) are stream-decompressed line by line.
+
+    resume=True continues from the '_analysis.checkpoint.json' sidecar: only the
+    lines appended since the last run are mined (with the saved Drain3 state) and
+    appended to the existing artifact. Rotated/truncated inputs fall back to a full run.
+    A last line still being written (no newline yet) is left for the next run.
+
+    two_phase=True only mines while streaming (cluster ids), then extracts parameters
+    per cluster against the FINAL templates, so early lines aren't matched against
+    templates that later generalize. 'workers' > 1 runs that phase in a process pool
+    (0/None = all cores).
+
+    persist_state=True warm-starts the miner from a snapshot on disk (cache/drain3_state_*.bin,
+    or 'state_file') and saves it back afterwards, so Template IDs stay stable across uploads.
+    The summary only lists the templates seen in THIS file, with this file's counts.
+
+    sharded=True gives every service (process token) its own Drain3 tree and mines the
+    shards in 'workers' processes. Services never share templates, so this only changes
+    how the work is split; Template IDs are offset per service to stay unique.
+    Sharded runs are always full, cold passes (resume/persist_state are ignored).
+
+    stream=True keeps memory flat on huge inputs: rows are spilled to disk every
+    STREAM_BATCH_SIZE lines and the Template Summary is built from the miner at the end.
+    Rows stay in file order (not grouped by Template ID) and parameters are extracted
+    per line, so two_phase/sharded don't apply.
+
+    Every run is timed per phase (read, preprocess, mining, extraction, write; sharded
+    mining includes its extraction) with lines/sec and template growth. The result is
+    returned and saved as '_analysis.stats.json'.
+
+    Returns: (output_artifact_path, total_lines, unique_clusters, stats_dict)
     """
     if not os.path.exists(target_file):
         raise FileNotFoundError(f"File not found: {target_file}")
+    timing = ParseStats()
 
-    # Initialize a FRESH miner for every run
+    # Initialize a FRESH miner (or warm-start the persistent one below)
     config = get_miner_config()
-    template_miner = TemplateMiner(config=config)
-    base_name, _ = os.path.splitext(target_file)
-    output_excel = f"{base_name}_analysis.xlsx"
+    template_miner = new_template_miner(config)
+    if sharded and (resume or persist_state):
+        print("[SHARD] Sharded mode runs a full pass with fresh miners (resume/persist_state ignored).")
+        resume = persist_state = False
+    if stream and (two_phase or sharded):
+        print("[STREAM] Streaming mode extracts per line (two_phase/sharded ignored).")
+        two_phase = sharded = False
+    if persist_state and state_file is None:
+        state_file = miner_state_path(config)
+    if persist_state:
+        state_file = os.path.abspath(state_file)
+    save_snapshot = persist_state
+    base_name, _ = split_log_name(target_file)
+    output_path = artifact_path(f"{base_name}_analysis")
     rows = []
 
+    # Compiled extractors per template + the template each cluster currently has
+    extractor_cache = TemplateExtractorCache()
+    cluster_templates = {}
+    line_indices = [] # two_phase: original line index of each row
+    headers, year_offsets = [], [] # tokenized syslog header of each row
+    years = YearInference()
+    dedup = ContentDedupCache() # repeated preprocessed lines skip the miner
+
+    # --- CHECKPOINT (incremental runs) ---
+    ckpt_file = checkpoint_path(f"{base_name}_analysis")
+    is_plain = detect_compression(target_file) is None
+    start_offset, next_index = 0, 0
+    previous_logs = None
+    previous_rows = 0
+    writer = SheetStreamWriter(output_path, 'Log Analysis', count_column="Template ID") if stream else None
+    if resume and os.path.exists(output_path):
+        ckpt = load_checkpoint(ckpt_file)
+        # Checkpoints without the header year state predate the Epoch column: full run
+        start_offset = resume_offset(target_file, ckpt) if ckpt and "header_years" in ckpt else 0
+        if start_offset:
+            years = YearInference.from_state(ckpt["header_years"])
+            # The shared snapshot holds this file's clusters plus whatever later uploads
+            # learned; resuming on the checkpoint's older tree would drop those on save
+            if persist_state and ckpt.get("state_file") == state_file \
+                    and load_persistent_state(template_miner, state_file):
+                print(f"[MINER] Resuming on the shared snapshot ({len(template_miner.drain.clusters)} known templates)")
+            else:
+                import_miner_state(template_miner, ckpt["miner_state"])
+                if persist_state:
+                    print("[MINER] Checkpoint predates the shared snapshot; leaving the snapshot unchanged.")
+                save_snapshot = False
+            next_index = ckpt["next_line_index"]
+            if stream:
+                writer.append_file(writer.target) # Earlier rows are copied batch by batch
+                previous_rows = writer.rows
+            else:
+                previous_logs = read_sheet(output_path, 'Log Analysis')
+                previous_rows = len(previous_logs)
+    if persist_state and not start_offset and load_persistent_state(template_miner, state_file):
+        print(f"[MINER] Warm start: {len(template_miner.drain.clusters)} known templates "
+              f"from {os.path.basename(state_file)}")
+
+    timing.lap("read") # Loading the checkpoint / warm-start state
+    template_count = lambda: len(template_miner.drain.clusters)
+
     # --- UPDATED TERMINAL OUTPUT START ---
     print("\n------ [PARSING INITIATED] ------")
     print(f"Input File:       {os.path.basename(target_file)}")
+    if start_offset:
+        print(f"Resumed At:       byte {start_offset} ({previous_rows} rows kept)")
 
-    with open(target_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for idx, line in enumerate(f): 
+    if is_plain:
+        # Incremental runs stop at the last complete line; a partial one waits for the next run
+        limit = complete_lines_end(target_file) if resume else None
+        if limit is not None and limit < os.path.getsize(target_file):
+            print("[CHECKPOINT] Last line is incomplete; leaving it for the next run.")
+        reader = open_log_at(target_file, start_offset, encoding='utf-8', errors='ignore', end=limit)
+    else:
+        reader = open_log(target_file, 'r', encoding='utf-8', errors='ignore')
+
+    with reader as f:
+        for idx, line in enumerate(f, start=next_index): 
+            next_index = idx + 1
             raw_line = line.strip()
             if not raw_line: continue
+            timing.lap("read")
+
+            # Streaming: spill a full batch before taking more rows
+            if stream and len(rows) >= STREAM_BATCH_SIZE:
+                writer.append(rows_frame(rows, headers, year_offsets))
+                rows, headers, year_offsets = [], [], []
+                timing.lap("write")
+
+            # Header is tokenized once here (Epoch / Service / Service PID columns)
+            header = tokenize_header(raw_line)
+            headers.append(header)
+            year_offsets.append(years.observe(raw_line, header[0]))
+
+            # Sharded: collect the lines, mining happens per service afterwards
+            if sharded:
+                rows.append({"Raw Log": raw_line, "Drained Named Log": None,
+                             "Template ID": None, "Parameters": None})
+                line_indices.append(idx)
+                timing.count_line(None)
+                timing.lap("preprocess")
+                continue
             
             # 1. Preprocess & Mine
-            content = preprocess_log(raw_line)
-            result = template_miner.add_log_message(content)
-            
-            template = result['template_mined']
-            cluster_id = result['cluster_id']
+            content, clean_raw_line = normalize_line(raw_line)
+            timing.lap("preprocess")
+            cluster_id, template, change_type, cached_params = mine_content(template_miner, content, dedup)
+            timing.count_line(template_count)
+            timing.lap("mining")
+
+            # Two-phase: just remember the cluster, extraction happens after mining
+            if two_phase:
+                rows.append({"Raw Log": raw_line, "Drained Named Log": None,
+                             "Template ID": cluster_id, "Parameters": None})
+                line_indices.append(idx)
+                continue
+
+            # Repeated line: reuse the cached extraction
+            if cached_params is not None:
+                rows.append({"Raw Log": raw_line, "Drained Named Log": template, "Template ID": cluster_id,
+                             "Parameters": reuse_parameters(cached_params, clean_raw_line, idx)})
+                timing.lap("extraction")
+                continue
+
+            # Drain3 generalized this cluster: its old template is dead
+            if change_type == 'cluster_template_changed':
+                old_template = cluster_templates.get(cluster_id)
+                if old_template is not None:
+                    extractor_cache.evict(old_template)
+            cluster_templates[cluster_id] = template
             
             # 2. Extract Variables
-            clean_raw_line = remove_trailing_timestamp(raw_line)
-            clean_raw_line = normalize_login_uid(clean_raw_line)
-            clean_raw_line = normalize_ftpd_rhost(clean_raw_line)
-            
-            params_json = extract_named_parameters(clean_raw_line, template, idx)
+            row_params = extract_named_parameters(clean_raw_line, template, idx, cache=extractor_cache)
+            dedup.attach_parameters(content, row_params)
             
             rows.append({
                 "Raw Log": raw_line,
                 "Drained Named Log": template,
                 "Template ID": cluster_id,
-                "Parameters": params_json
+                "Parameters": row_params
             })
+            timing.lap("extraction")
+        end_offset = f.buffer.tell() if is_plain else None
+    timing.lap("read")
 
-    if not rows:
-        return None, 0, 0
-    # --- UPDATED TERMINAL OUTPUT END ---
-    unique_clusters = len(template_miner.drain.clusters)
-    print(f"Unique Templates: {unique_clusters}")
-    print("---------------------------------")
-    print(f"File Saved To:    {os.path.abspath(output_excel)}\n")
-        
+    if sharded and rows:
+        final_templates = mine_sharded(rows, line_indices, [h[5] for h in headers], workers)
+        timing.lap("mining")
+        timing.sample(len(final_templates))
+    else:
+        if timing.lines % timing.sample_every:
+            timing.sample(template_count())
+        if two_phase and rows:
+            extract_against_final_templates(template_miner, rows, line_indices, workers)
+            timing.lap("extraction")
+        final_templates = [(c.cluster_id, c.get_template()) for c in template_miner.drain.clusters]
+
+    anchor_year = years.resolved_year()
+    if stream:
+        if rows:
+            writer.append(rows_frame(rows, headers, year_offsets))
+        if not writer.rows:
+            return None, 0, 0, None
+        # Occurrences were counted batch by batch while spilling
+        occurrences = writer.counts
+        total_rows = writer.rows
+    else:
+        if not rows and previous_logs is None:
+            return None, 0, 0, None
+        # --- UPDATED TERMINAL OUTPUT END ---
         # Create DataFrames
-    df_logs = pd.DataFrame(rows)
-    df_logs = df_logs.sort_values(by="Template ID")
-    df_logs = df_logs[["Raw Log", "Drained Named Log", "Template ID", "Parameters"]]
-    
+        # Parameters become real columns ('Line Index', TIMESTAMP, HOSTNAME, PID, USERNAME, ...)
+        df_logs = resolve_header_parts(rows_frame(rows, headers, year_offsets), anchor_year)
+        if previous_logs is not None:
+            df_logs = pd.concat([previous_logs, df_logs], ignore_index=True)
+        df_logs = apply_parameter_dtypes(df_logs)
+        df_logs = df_logs.sort_values(by="Template ID", kind="stable")
+        df_logs = order_log_columns(df_logs)
+
+        # Occurrences come from this file's rows (a warm-started miner also
+        # holds templates and counts from earlier uploads)
+        occurrences = df_logs["Template ID"].value_counts().to_dict()
+        total_rows = len(df_logs)
     clusters = []
-    for cluster in template_miner.drain.clusters:
+    for cluster_id, template in final_templates:
+        if cluster_id not in occurrences:
+            continue
         clusters.append({
-            "Template ID": cluster.cluster_id,
-            "Template Pattern": cluster.get_template(),
-            "Occurrences": cluster.size
+            "Template ID": cluster_id,
+            "Template Pattern": template,
+            "Occurrences": int(occurrences[cluster_id])
         })
     df_summary = pd.DataFrame(clusters)
     df_summary = df_summary.sort_values(by="Occurrences", ascending=False)
+
+    print(f"Unique Templates: {len(df_summary)}")
+    print(f"[TIME] Year detected: {anchor_year} "
+          f"(Source: {'Logs' if years.anchor_year is not None else 'System Date'})")
+    if years.rolled_over:
+        print("[TIME] Detected Year Rollover (Dec -> Jan). Adjusting subsequent logs.")
+    if persist_state:
+        print(f"[MINER] Templates known across runs: {len(template_miner.drain.clusters)}")
+    dedup_stats = dedup.stats()
+    if not sharded:
+        print(f"[DEDUP] Repeated lines: {dedup_stats['line_hits']} exact + {dedup_stats['masked_hits']} masked hits "
+              f"/ {dedup_stats['misses']} misses ({dedup_stats['hit_rate']:.1%} hit rate, "
+              f"{dedup_stats['resets']} resets)")
+    stats = extractor_cache.stats()
+    if not (two_phase or sharded):
+        print(f"[CACHE] Extractors: {stats['hits']} hits / {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate, {stats['evictions']} evicted)")
+    print("---------------------------------")
+    print(f"File Saved To:    {os.path.abspath(output_path)}\n")
     
-    # Write to Excel
-    with pd.ExcelWriter(output_excel) as writer:
-        df_logs.to_excel(writer, sheet_name='Log Analysis', index=False)
-        df_summary.to_excel(writer, sheet_name='Template Summary', index=False)
+    # Write the artifact (Excel only on request)
+    if stream:
+        batches = len(writer.parts)
+        writer.close(transform=lambda df: order_log_columns(resolve_header_parts(df, anchor_year)))
+        write_sheets(output_path, {'Template Summary': df_summary})
+        print(f"[STREAM] Wrote {writer.rows} rows through {batches} spilled batches.")
+    else:
+        write_sheets(output_path, {'Log Analysis': df_logs, 'Template Summary': df_summary})
+    if excel:
+        export_excel(output_path)
+
+    # Remember where we stopped (plain files only: offsets need a seekable input).
+    # A run that ended inside a line can't be resumed safely: no checkpoint, next resume is a full pass
+    if end_offset is not None and not at_line_boundary(target_file, end_offset):
+        end_offset = None
+        if os.path.exists(ckpt_file):
+            os.remove(ckpt_file)
+    if end_offset is not None and not sharded:
+        save_checkpoint(ckpt_file, {
+            **input_fingerprint(target_file, end_offset),
+            "next_line_index": next_index,
+            "miner_state": export_miner_state(template_miner),
+            # Appended lines must get the same year as the rows already written
+            "header_years": {**years.to_state(), "anchor_year": years.resolved_year()},
+            # Resume can continue on the shared snapshot only if this run saved into it
+            "state_file": state_file if save_snapshot else None,
+        })
+    if save_snapshot:
+        save_persistent_state(template_miner, state_file)
+    timing.lap("write")
+
+    mode = "stream" if stream else "sharded" if sharded else "two_phase" if two_phase else "single"
+    run_stats = timing.result(input=os.path.basename(target_file), mode=mode, workers=workers,
+                             resumed_rows=previous_rows, total_rows=total_rows, templates=len(df_summary))
+    save_stats(stats_path(f"{base_name}_analysis"), run_stats)
+    phases = " | ".join(f"{phase} {seconds:.2f}s" for phase, seconds in run_stats["phases"].items())
+    print(f"[STATS] {run_stats['lines']} lines in {run_stats['seconds']:.2f}s "
+          f"({run_stats['lines_per_sec']:,.0f} lines/s): {phases}")
     
-    return output_excel, len(df_logs), len(df_summary)
-        
\ No newline at end of file
+    return output_path, total_rows, len(df_summary), run_stats
\ No newline at end of file
@@ -1,49 +1,45 @@
 import pandas as pd
-import json
 import os
-import re
-from dateutil import parser
 
 # --- IMPORTS FROM NEW MODULES ---
-from graph_generator import create_all_charts
+from graph_generator import create_all_charts, volume_peak
 from static_report import write_executive_report
 from fail2ban_logic import scan_threats
+from artifact_store import (artifact_path, read_sheet, write_sheets, export_excel,
+                            LINE_INDEX_COLUMN, parameter_columns, ensure_header_columns)
+from syslog_header import epoch_to_datetime
 
 # ==========================================
 # PART 1: SENTENCE CONSTRUCTION
 # ==========================================
 
-def fill_meaning_from_json(row, meaning_map):
+def fill_meaning_from_columns(row, meaning_map, param_cols):
     template_id = str(row.get('Template ID', ''))
-    params_json = row.get('Parameters')
     meaning_template = meaning_map.get(template_id)
     
     if not meaning_template: return "Error: Template ID not found"
-    if pd.isna(params_json) or str(params_json).strip() == '{}': return meaning_template
 
-    try:
-        params_dict = json.loads(str(params_json))
-        final_sentence = meaning_template
-        for key, value in params_dict.items():
-            placeholder = f"<{key}>"
-            final_sentence = final_sentence.replace(placeholder, str(value))
-        return final_sentence
-    except:
-        return meaning_template
+    final_sentence = meaning_template
+    for key in param_cols:
+        value = row[key]
+        if pd.isna(value): continue # Tag not extracted for this line
+        final_sentence = final_sentence.replace(f"<{key}>", str(value))
+    return final_sentence
     
 def step_1_merge_sentences(input_file):
     print(f"[MERGE] Merging parameters in: {os.path.basename(input_file)}")
     try:
-        df_logs = pd.read_excel(input_file, sheet_name="Log Analysis")
-        df_templates = pd.read_excel(input_file, sheet_name="Template Summary")
+        df_logs = read_sheet(input_file, "Log Analysis")
+        df_templates = read_sheet(input_file, "Template Summary")
     except Exception as e:
-        raise ValueError(f"Error reading Excel file: {e}")
+        raise ValueError(f"Error reading artifact: {e}")
     
     df_logs['Template ID'] = df_logs['Template ID'].astype(str)
     df_templates['Template ID'] = df_templates['Template ID'].astype(str)
     meaning_map = dict(zip(df_templates['Template ID'], df_templates['Event Meaning']))
     
-    df_logs['Meaning Log'] = df_logs.apply(lambda row: fill_meaning_from_json(row, meaning_map), axis=1)
+    param_cols = parameter_columns(df_logs)
+    df_logs['Meaning Log'] = df_logs.apply(lambda row: fill_meaning_from_columns(row, meaning_map, param_cols), axis=1)
     
     # Reorder Columns
     cols = list(df_logs.columns)
@@ -57,13 +53,11 @@ def step_1_merge_sentences(input_file):
     base_dir = os.path.dirname(input_file)
     base_name = os.path.basename(input_file)
     stem, _ext = os.path.splitext(base_name)
-    new_name = f"{stem}_merged.xlsx"
+    new_name = artifact_path(f"{stem}_merged")
     output_path = os.path.join(base_dir, new_name)
     
     print(f"[MERGE] Saving to: {os.path.basename(output_path)}")
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df_logs.to_excel(writer, sheet_name='Log Analysis', index=False)
-        df_templates.to_excel(writer, sheet_name='Template Summary', index=False)
+    write_sheets(output_path, {'Log Analysis': df_logs, 'Template Summary': df_templates})
         
     return output_path
 
@@ -71,74 +65,49 @@ def step_1_merge_sentences(input_file):
 # PART 2: SORTING
 # ==========================================
 
-def get_time_from_json(params_str):
-    try:
-        if pd.isna(params_str): return pd.NaT
-        params = json.loads(str(params_str))
-        time_str = params.get('TIMESTAMP')
-        if not time_str: return pd.NaT
-        return parser.parse(time_str)
-    except:
-        return pd.NaT
-
-def step_2_sort_logs(input_file):
-    print(f"[SORT] Processing Excel: {os.path.basename(input_file)}")
+def step_2_sort_logs(input_file, excel=False):
+    """Sorts the merged logs back into file order. excel=True also exports an .xlsx copy."""
+    print(f"[SORT] Processing: {os.path.basename(input_file)}")
     
-    # 1. Load the Excel Data
+    # 1. Load the Artifact Data
     try:
-        df_logs = pd.read_excel(input_file, sheet_name="Log Analysis")
-        df_templates = pd.read_excel(input_file, sheet_name="Template Summary")
+        df_logs = read_sheet(input_file, "Log Analysis")
+        df_templates = read_sheet(input_file, "Template Summary")
     except Exception as e:
-        raise ValueError(f"Error reading Excel file: {e}")
-
-    # 2. Sort using the Embedded Index (Source of Truth)
-    if 'Parameters' in df_logs.columns:
-        print("[SORT] Sorting based on embedded '_Original_Line_Index'...")
+        raise ValueError(f"Error reading artifact: {e}")
 
-        def get_index_from_json(params_str):
-            try:
-                if pd.isna(params_str): return 999999999
-                # Parse JSON
-                params = json.loads(str(params_str))
-                # Extract the index we saved in parser.py (default to high number if missing)
-                return int(params.get('_Original_Line_Index', 999999999))
-            except:
-                return 999999999
+    # 2. Sort using the Line Index column (Source of Truth)
+    if LINE_INDEX_COLUMN in df_logs.columns:
+        print(f"[SORT] Sorting based on '{LINE_INDEX_COLUMN}'...")
 
-        # Create temporary sorting column
-        df_logs['_Sort_Index'] = df_logs['Parameters'].apply(get_index_from_json)
-        
         # Verify if we actually found indices
-        valid_count = (df_logs['_Sort_Index'] != 999999999).sum()
+        valid_count = df_logs[LINE_INDEX_COLUMN].notna().sum()
         print(f"[SORT] Found valid indices for {valid_count}/{len(df_logs)} rows.")
 
-        # Perform the Sort
-        df_logs = df_logs.sort_values(by='_Sort_Index', ascending=True)
-        
-        # Clean up
-        df_logs = df_logs.drop(columns=['_Sort_Index'])
+        # Perform the Sort (rows without an index go last)
+        df_logs = df_logs.sort_values(by=LINE_INDEX_COLUMN, ascending=True, kind="stable", na_position="last")
         
     else:
-        print("[WARN] 'Parameters' column missing. Cannot perform strict sorting.")
+        print(f"[WARN] '{LINE_INDEX_COLUMN}' column missing. Cannot perform strict sorting.")
 
     # 3. Save Sorted File
     base_dir = os.path.dirname(input_file)
     filename = os.path.basename(input_file)
     stem, _ext = os.path.splitext(filename)
-    new_name = f"{stem}_sorted.xlsx"
+    new_name = artifact_path(f"{stem}_sorted")
     output_path = os.path.join(base_dir, new_name)
 
     print(f"[SORT] Saving to: {os.path.basename(output_path)}")
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df_logs.to_excel(writer, sheet_name='Log Analysis', index=False)
-        df_templates.to_excel(writer, sheet_name='Template Summary', index=False)
+    write_sheets(output_path, {'Log Analysis': df_logs, 'Template Summary': df_templates})
+    if excel:
+        export_excel(output_path)
 
     return output_path
 
 # ==========================================
 # PART 3: REPORT & ANALYTICS
 # ==========================================
-def step_3_generate_report(file_path):
+def step_3_generate_report(file_path, charts=True):
     print(f"[REPORT] Generating analytics for: {os.path.basename(file_path)}")
     
     base_dir = os.path.dirname(file_path)
@@ -146,9 +115,9 @@ def step_3_generate_report(file_path):
     
     # 1. Load Data
     try:
-        df_logs = pd.read_excel(file_path, sheet_name='Log Analysis')
+        df_logs = read_sheet(file_path, 'Log Analysis')
         try:
-            df_templates = pd.read_excel(file_path, sheet_name='Template Summary')
+            df_templates = read_sheet(file_path, 'Template Summary')
             if not df_templates.empty:
                 df_templates['Template ID'] = df_templates['Template ID'].astype(str)
                 generic_meaning_map = dict(zip(df_templates['Template ID'], df_templates['Event Meaning']))
@@ -158,97 +127,17 @@ def step_3_generate_report(file_path):
             df_templates = pd.DataFrame()
             generic_meaning_map = {}
     except Exception as e:
-        raise ValueError(f"Error reading Excel: {e}")
+        raise ValueError(f"Error reading artifact: {e}")
 
     # 2. Process Data
     df_logs.columns = [c.strip() for c in df_logs.columns]
-    df_logs['params'] = df_logs['Parameters'].apply(lambda x: json.loads(x) if isinstance(x, str) else {})
-    df_logs['USERNAME'] = df_logs['params'].apply(lambda x: x.get('USERNAME', 'N/A'))
-    df_logs['RHOST'] = df_logs['params'].apply(lambda x: x.get('RHOST', 'N/A'))
-    
-    def extract_service(raw):
-        try:
-            parts = str(raw).split()
-            if len(parts) > 4: return re.split(r'\[|:', parts[4])[0]
-        except: pass
-        return "Unknown"
-    df_logs['Service'] = df_logs['Raw Log'].apply(extract_service)
-
-# --- YEAR SCANNING LOGIC ---
-    import datetime
- # 1. Detect Anchor Year
-    anchor_year = datetime.datetime.now().year
-    found_year = False
-    
-    # CHANGE: Instead of a subset, we iterate through the ENTIRE dataframe.
-    # We use df_logs.iterrows() directly.
-    for index, row in df_logs.iterrows():
-        
-        # Priority A: Check JSON Timestamp
-        ts_json = str(row['params'].get('TIMESTAMP', ''))
-        match_json = re.search(r'(20\d{2})', ts_json)
-        
-        if match_json:
-            anchor_year = int(match_json.group(1))
-            found_year = True
-            break  # STOP scanning once we find it!
-        
-        # Priority B: Check END of Raw Log
-        raw_str = str(row['Raw Log']).strip()
-        match_end = re.search(r'(20\d{2})\s*$', raw_str)
-        
-        if match_end:
-            anchor_year = int(match_end.group(1))
-            found_year = True
-            break  # STOP scanning once we find it!
-            
-    print(f"[TIME] Year detected: {anchor_year} (Source: {'Logs' if found_year else 'System Date'})")
-
-   # 2. Parse Dates (Robust Method)
-    def parse_time(row):
-        ts = row['params'].get('TIMESTAMP', '')
-        
-        # Fallback: Scrape Raw Log if JSON is empty
-        if not ts: 
-            parts = str(row['Raw Log']).split()
-            # Standard syslog often puts date at START (Jul 15 ...)
-            if len(parts) >= 3: ts = " ".join(parts[:3])
-            
-        try:
-            ts_str = str(ts).strip()
-            
-            # PREPEND YEAR FIX:
-            # If timestamp doesn't start with 20xx, prepend the anchor year.
-            if not re.match(r'^20\d{2}', ts_str):
-                ts_str = f"{anchor_year} {ts_str}"
-            
-            return pd.to_datetime(ts_str)
-        except:
-            return pd.NaT
-
-    df_logs['datetime'] = df_logs.apply(parse_time, axis=1)
-    
-    # 3. Handle Year Rollover (Dec 31 -> Jan 01)
-    mask_valid = df_logs['datetime'].notna()
-    if mask_valid.sum() > 0:
-        months = df_logs.loc[mask_valid, 'datetime'].dt.month.tolist()
-        
-        rollover_index = -1
-        # Scan for the "12 -> 1" drop
-        for i in range(len(months) - 1):
-            if months[i] == 12 and months[i+1] == 1:
-                rollover_index = i + 1
-                break
-        
-        # Apply +1 Year to everything after the rollover
-        if rollover_index != -1:
-            print("[TIME] Detected Year Rollover (Dec -> Jan). Adjusting subsequent logs.")
-            valid_indices = df_logs[mask_valid].index
-            indices_to_update = valid_indices[rollover_index:]
-            
-            df_logs.loc[indices_to_update, 'datetime'] = df_logs.loc[indices_to_update, 'datetime'].apply(
-                lambda dt: dt.replace(year=dt.year + 1)
-            )
+    # Parameter columns are read directly (missing tag = NA)
+    for col in ('USERNAME', 'RHOST'):
+        df_logs[col] = df_logs[col].fillna('N/A') if col in df_logs.columns else 'N/A'
+    # Time and service were tokenized once at parse time (Epoch / Service columns)
+    df_logs = ensure_header_columns(df_logs)
+    df_logs['datetime'] = epoch_to_datetime(df_logs['Epoch'])
+    df_logs['Service'] = df_logs['Service'].fillna('Unknown')
 
     # Filter out invalid dates
     df_logs = df_logs.dropna(subset=['datetime'])
@@ -283,14 +172,17 @@ def step_3_generate_report(file_path):
 
     # 4. Graph Settings
     if total_hours < 4:
-        resample_rule = '1T'; date_format = '%H:%M'; xlabel_text = "Time (HH:MM)"; time_unit = "Minute"
+        resample_rule = '1min'; date_format = '%H:%M'; xlabel_text = "Time (HH:MM)"; time_unit = "Minute"
     elif total_hours < 48:
-        resample_rule = '1H'; date_format = '%d %b %H:00'; xlabel_text = "Time (Day Hour)"; time_unit = "Hour"
+        resample_rule = '1h'; date_format = '%d %b %H:00'; xlabel_text = "Time (Day Hour)"; time_unit = "Hour"
     else:
         resample_rule = '1D'; date_format = '%b %d'; xlabel_text = "Date"; time_unit = "Day"
 
-    # 5. Generate Charts
-    peak_str, peak_vol = create_all_charts(df_logs, base_dir, resample_rule, time_unit, date_format, xlabel_text)
+    # 5. Generate Charts (charts=False only computes the volume peak for the report)
+    if charts:
+        peak_str, peak_vol = create_all_charts(df_logs, base_dir, resample_rule, time_unit, date_format, xlabel_text)
+    else:
+        peak_str, peak_vol = volume_peak(df_logs, resample_rule, date_format)
 
     # 6. Threat Scanning (Fail2Ban)
     try:
@@ -0,0 +1,175 @@
+import os
+import re
+from collections import Counter
+
+# ==========================================
+# RULE-BASED MEANINGS (no LLM)
+# ==========================================
+# Most templates come from a handful of daemons with a few message shapes.
+# rule_meaning() builds the sentence for those from a fixed grammar:
+#   "At <TIMESTAMP>, <service> running as process <PID> on server <HOSTNAME> <event>."
+# and returns None for anything it doesn't know, so the LLM only sees the rest.
+# fallback_meaning() always returns a (plain) sentence; it is what offline mode
+# uses for templates no rule, cache entry or similar template covers.
+
+# Same services as the knowledge base in the LLM prompt, plus a few other classic daemons
+SERVICE_NAMES = {
+    "sshd": "Secure Shell service",
+    "ftpd": "File Transfer Protocol service",
+    "telnetd": "Telnet service",
+    "su": "Substitute User utility",
+    "login": "System Login process",
+    "unix_chkpwd": "Password Verification Helper",
+    "passwd": "Password Management tool",
+    "klogind": "Kerberos Login service",
+    "xinetd": "Extended Internet Services daemon",
+    "snmpd": "Network Management service",
+    "gdm": "GNOME Display Manager",
+    "gdm-binary": "GNOME Display Manager",
+    "PAM-rootok": "Root Permission Checker",
+    "rshd": "Remote Shell service",
+    "rlogind": "Remote Login service",
+    "in.rexecd": "Remote Execution service",
+    "fingerd": "Finger user-information service",
+    "mingetty": "console terminal manager",
+    "wall": "broadcast message tool",
+    "shutdown": "System Shutdown command",
+    "syslogd": "System Logging daemon",
+    "klogd": "Kernel Logging daemon",
+    "crond": "Scheduled Task daemon",
+    "cups": "Printing service",
+}
+
+# '<TIMESTAMP> <HOSTNAME> program(module)[<PID>]: message' (module and pid optional)
+TEMPLATE_HEADER = re.compile(
+    r"^<TIMESTAMP> <HOSTNAME> (?P<program>[^\s\[\(:]+)(?:\((?P<module>[^)\s]*)\))?"
+    r"(?:\[(?P<pid><PID>|\d+)\])?:\s*(?P<message>.*)$")
+
+# Same tags as parser.TAG_PATTERN: the ones step_1_merge_sentences fills back in
+PLACEHOLDER_PATTERN = re.compile(r"<[A-Z]+>")
+
+
+def _auth_failure(m):
+    """'authentication failure; logname= uid=... rhost=... user=...' -> event phrase."""
+    event = f"reported {m['more'] + ' more ' if m['more'] else 'an '}authentication failure"
+    if m["user"]:
+        event += f" for user {m['user']}"
+    if m["rhost"]:
+        event += f" from remote host {m['rhost']}"
+    details = [f"{label} {m[key]}" for key, label in (("uid", "user ID"), ("euid", "effective user ID"),
+                                                       ("tty", "terminal"), ("logname", "login name"),
+                                                       ("ruser", "remote user")) if m[key]]
+    if details:
+        event += f" ({', '.join(details)})"
+    return event
+
+
+def _succeeded(m):
+    if m["signal"]:
+        return f"reported that sending the {m['signal']} signal to {m['target']} succeeded"
+    if m["action"]:
+        return f"reported that the {m['action']} action of {m['target']} succeeded"
+    return "reported that its service action succeeded"
+
+
+# (message pattern, event phrase) - the phrase is a format string over the named
+# groups, or a function of the match. Patterns must match the whole message.
+RULES = [
+    (r"session (?P<state>\S+) for user (?P<user>\S+?)(?: by \(uid=(?P<uid>\S+)\))?",
+     lambda m: f"reported that a session entered the {m['state']} state for user {m['user']}"
+               + (f" (initiated by user ID {m['uid']})" if m["uid"] else "")),
+    (r"(?:(?P<more>\d+|<NUM>) more )?authentication failure; logname=(?P<logname>\S*) uid=(?P<uid>\S*) "
+     r"euid=(?P<euid>\S*) tty=(?P<tty>\S*) ruser=(?P<ruser>\S*) rhost=(?P<rhost>\S*)(?: user=(?P<user>\S*))?",
+     _auth_failure),
+    (r"check pass; user (?P<user>\S+)",
+     "reported a password check error regarding user {user}"),
+    (r"(?:connection|connect) from (?P<host>\S+?)(?: \((?P<alias>\S+)\))?",
+     lambda m: f"received a connection request from remote host {m['host']}"
+               + (f" ({m['alias']})" if m["alias"] else "")),
+    (r"Connection from (?P<host>\S+) on illegal port",
+     "rejected a connection from remote host {host} because it came from an illegal (unprivileged) port"),
+    (r"ANONYMOUS FTP LOGIN FROM (?P<host>\S+?),?",
+     "accepted an anonymous FTP login from remote host {host}"),
+    (r"User unknown timed out after (?P<seconds>\S+) seconds",
+     "closed the session of an unknown user after it timed out after {seconds} seconds"),
+    (r"bad username \[(?P<user>[^\]]*)\]",
+     "rejected the login attempt because username {user} is not valid"),
+    (r"password changed for (?P<user>\S+)",
+     "reported that the password of user {user} was changed"),
+    (r"Kerberos authentication failed",
+     "reported that a Kerberos authentication attempt failed"),
+    (r"Authentication failed from (?P<host>\S+) \((?P<alias>\S+)\): (?P<reason>.+)",
+     "reported a failed authentication from remote host {host} ({alias}) with the reason: {reason}"),
+    (r"FAILED LOGIN (?P<count>\S+) FROM \((?P<host>[^)]*)\) FOR (?P<user>\S+?), (?P<reason>.+)",
+     "reported failed login attempt number {count} from remote host {host} for user {user} ({reason})"),
+    (r"service\((?P<service>[^)]+)\) ignoring max retries; (?P<tries>\S+) > (?P<limit>\S+)",
+     "stopped retrying {service} authentication because {tries} attempts exceeded the limit of {limit}"),
+    (r"Received SNMP packet\(s\) from (?P<host>\S+)",
+     "received SNMP packets from remote host {host}"),
+    (r"\[smux_accept\] accepted fd (?P<fd>\S+) from (?P<host>\S+)",
+     "accepted an SMUX peer connection on file descriptor {fd} from remote host {host}"),
+    (r"(?:(?P<target>[\w.\-]+) )?(?:-(?P<signal>[A-Z]+) |(?P<action><STATE>) )?succeeded",
+     _succeeded),
+    (r"ttloop: (?:peer died|read): (?P<reason>.+)",
+     "lost the connection to its client ({reason})"),
+    (r"Couldn't authenticate user",
+     "reported that it could not authenticate the user"),
+    (r"shutting down for system reboot",
+     "reported that the system is shutting down for a reboot"),
+]
+RULES = [(re.compile(pattern), phrase) for pattern, phrase in RULES]
+
+
+def parse_template_header(template):
+    """Template -> dict(program, module, pid, message), or None if it has no syslog header."""
+    match = TEMPLATE_HEADER.match(template.strip())
+    return match.groupdict() if match else None
+
+
+def service_phrase(header):
+    """'the Secure Shell service (sshd, pam_unix module) running as process <PID>'."""
+    program = header["program"]
+    name = SERVICE_NAMES.get(os.path.basename(program))
+    label = program + (f", {header['module']} module" if header["module"] else "")
+    phrase = f"the {name} ({label})" if name else f"the {program} program" + (
+        f" ({header['module']} module)" if header["module"] else "")
+    if header["pid"]:
+        phrase += f" running as process {header['pid']}"
+    return phrase
+
+
+def _sentence(header, event):
+    return f"At <TIMESTAMP>, {service_phrase(header)} on server <HOSTNAME> {event}."
+
+
+def keeps_placeholders(template, meaning):
+    """True if every placeholder of the template appears in the meaning (as often as in the template)."""
+    missing = Counter(PLACEHOLDER_PATTERN.findall(template))
+    missing.subtract(PLACEHOLDER_PATTERN.findall(meaning))
+    return all(count <= 0 for count in missing.values())
+
+
+def rule_meaning(template):
+    """Meaning from the rule grammar, or None if no rule covers this template."""
+    header = parse_template_header(template)
+    if header is None:
+        return None
+    message = header["message"].strip()
+    for pattern, phrase in RULES:
+        match = pattern.fullmatch(message)
+        if match is None:
+            continue
+        groups = {key: value or "" for key, value in match.groupdict().items()}
+        event = phrase(groups) if callable(phrase) else phrase.format(**groups)
+        meaning = _sentence(header, event)
+        return meaning if keeps_placeholders(template, meaning) else None
+    return None
+
+
+def fallback_meaning(template):
+    """Always-available plain sentence that quotes the message (offline mode)."""
+    header = parse_template_header(template)
+    if header is None:
+        return f"The system logged the message: {template.strip()}"
+    message = header["message"].strip().rstrip(".")
+    return _sentence(header, f"logged the message: {message}")
@@ -1,6 +1,5 @@
 import pandas as pd
 import datetime
-import json
 
 def format_duration(seconds):
     s = int(seconds)
@@ -41,16 +40,11 @@ def analyze_sessions(df):
     completed_sessions = []
     
     for _, row in df_events.iterrows():
-        try:
-            raw_params = row.get('Parameters', '{}')
-            if pd.isna(raw_params): raw_params = '{}'
-            params = json.loads(str(raw_params))
-        except:
-            params = {}
-        
-        pid = str(params.get('PID', 'Unknown'))
-        user = params.get('USERNAME')
-        if not user: user = row.get('USERNAME', 'N/A')
+        # Typed parameter columns (NA = tag not extracted for this line)
+        pid = row.get('PID')
+        pid = 'Unknown' if pd.isna(pid) else str(pid)
+        user = row.get('USERNAME')
+        if pd.isna(user): user = 'N/A'
 
         ts = row['datetime']
         service = row.get('Service', 'Unknown')
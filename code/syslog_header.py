@@ -0,0 +1,138 @@
+import re
+import datetime
+import pandas as pd
+
+# ==========================================
+# SYSLOG HEADER TOKENIZER
+# ==========================================
+# "Jun 18 02:08:12 combo sshd(pam_unix)[1234]: ..." is tokenized ONCE at parse time into
+# Epoch / Service / Service PID columns, so later stages never split 'Raw Log' again.
+HEADER_FIELDS = re.compile(r'^([A-Z][a-z]{2})\s+(\d+)\s(\d{2}):(\d{2}):(\d{2})\s+\S+')
+SERVICE_SPLIT = re.compile(r'\[|:')
+SERVICE_PID = re.compile(r'\[(\d+)\]')
+
+# Year hints: trailing "... 2005" or a full "Sat Jun 18 02:08:12 2005" date in the line
+TRAILING_YEAR = re.compile(r'(20\d{2})\s*$')
+
+MONTHS = {name: number for number, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+HEADER_COLUMNS = ["Epoch", "Service", "Service PID"]
+
+
+def tokenize_header(raw_line):
+    """
+    Returns (month, day, hour, minute, second, service, pid) for one log line.
+    The time fields are None when the line has no syslog header; service is the
+    5th token up to '[' or ':' ('Unknown' if missing), pid the number in its brackets.
+    """
+    tokens = raw_line.split(None, 5)
+    if len(tokens) > 4:
+        process = tokens[4]
+        service = SERVICE_SPLIT.split(process, 1)[0]
+        pid_match = SERVICE_PID.search(process)
+        pid = int(pid_match.group(1)) if pid_match else None
+    else:
+        service, pid = "Unknown", None
+
+    match = HEADER_FIELDS.match(raw_line)
+    month = MONTHS.get(match.group(1)) if match else None
+    if month is None:
+        return None, None, None, None, None, service, pid
+    return (month, int(match.group(2)), int(match.group(3)), int(match.group(4)),
+            int(match.group(5)), service, pid)
+
+
+class YearInference:
+    """
+    Streaming year inference for year-less syslog timestamps (lines in file order):
+      * anchor year = first year found in the log (trailing '2005'), else the current year
+      * the first Dec -> Jan step moves every later line to the next year
+    """
+    def __init__(self, anchor_year=None, rolled_over=False, last_month=None):
+        self.anchor_year = anchor_year
+        self.rolled_over = rolled_over
+        self.last_month = last_month
+
+    def observe(self, raw_line, month):
+        """Feeds one line; returns its year offset (0, or 1 after the rollover)."""
+        if self.anchor_year is None:
+            match = TRAILING_YEAR.search(raw_line)
+            if match:
+                self.anchor_year = int(match.group(1))
+        if month is None:
+            return None
+        if not self.rolled_over and self.last_month == 12 and month == 1:
+            self.rolled_over = True
+        self.last_month = month
+        return 1 if self.rolled_over else 0
+
+    def resolved_year(self):
+        return self.anchor_year if self.anchor_year is not None else datetime.datetime.now().year
+
+    def to_state(self):
+        return {"anchor_year": self.anchor_year, "rolled_over": self.rolled_over, "last_month": self.last_month}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(**state) if state else cls()
+
+
+# Raw time fields kept until the anchor year is known (streamed batches are written before that)
+HEADER_PARTS = ["_year_offset", "_month", "_day", "_hour", "_minute", "_second"]
+
+
+def header_parts(headers, year_offsets, index=None):
+    """
+    headers: tokenize_header() tuples, year_offsets: YearInference.observe() results.
+    Returns Service / Service PID plus the raw time fields (HEADER_PARTS) of every line.
+    """
+    parts = pd.DataFrame.from_records(
+        headers, index=index, columns=HEADER_PARTS[1:] + ["Service", "Service PID"])
+    parts.insert(0, "_year_offset", pd.Series(year_offsets, index=parts.index, dtype="Float64"))
+    parts["Service"] = parts["Service"].astype("string")
+    parts["Service PID"] = pd.to_numeric(parts["Service PID"]).astype("Int64")
+    return parts
+
+
+def resolve_header_parts(df, anchor_year):
+    """
+    Replaces the HEADER_PARTS columns of 'df' by Epoch (Int64 seconds, naive time).
+    Rows without parts keep the Epoch they already have (rows of an earlier run).
+    """
+    if "_month" not in df.columns:
+        return df
+    fields = {"year": df["_year_offset"] + anchor_year}
+    for name in ("month", "day", "hour", "minute", "second"):
+        fields[name] = df[f"_{name}"].astype("Float64")
+    stamps = pd.to_datetime(pd.DataFrame(fields, index=df.index), errors="coerce")
+    epoch = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    valid = stamps.notna()
+    epoch[valid] = (stamps[valid] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    if "Epoch" in df.columns:
+        df["Epoch"] = epoch.fillna(df["Epoch"].astype("Int64"))
+    else:
+        df.insert(df.columns.get_loc("_year_offset"), "Epoch", epoch)
+    return df.drop(columns=HEADER_PARTS)
+
+
+def header_frame(headers, year_offsets, anchor_year, index=None):
+    """Typed header columns in one go: Epoch, Service, Service PID."""
+    df = resolve_header_parts(header_parts(headers, year_offsets, index=index), anchor_year)
+    return df[HEADER_COLUMNS]
+
+
+def tokenize_lines(raw_lines, index=None):
+    """One-shot version for a whole column of raw lines (used for legacy inputs)."""
+    years = YearInference()
+    headers, offsets = [], []
+    for raw_line in raw_lines:
+        header = tokenize_header(str(raw_line))
+        headers.append(header)
+        offsets.append(years.observe(str(raw_line), header[0]))
+    return header_frame(headers, offsets, years.resolved_year(), index=index)
+
+
+def epoch_to_datetime(epoch):
+    """Epoch column -> naive datetime64 (NA -> NaT)."""
+    return pd.to_datetime(epoch.astype("Float64"), unit="s")
@@ -0,0 +1,110 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from rule_meanings import PLACEHOLDER_PATTERN, keeps_placeholders
+
+# ==========================================
+# NEAR-DUPLICATE TEMPLATE REUSE
+# ==========================================
+# Drain3 often splits one event into variants that differ by a token or a
+# placeholder ("session <STATE> for user <USERNAME>" with and without
+# "by (uid=<UID>)"). A cached meaning of a close variant is reused, with its
+# placeholders adapted, instead of asking the LLM again.
+TOKEN_PATTERN = re.compile(r"<[A-Z]+>|<\*>|\w+|[^\w\s]")
+
+
+def tokenize_template(template):
+    """Template -> [(token, start, end)] on the masked form (placeholders stay whole)."""
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(template)]
+
+
+def _is_word(token):
+    return token[0].isalnum() or token[0] == "_"
+
+
+def program_of(tokens):
+    """First word token (the program, e.g. 'su' or 'sshd'); variants must share it."""
+    for token, _, _ in tokens:
+        if _is_word(token):
+            return token
+    return ""
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def adapt_meaning(source_template, meaning, target_template):
+    """
+    Rewrites a meaning written for 'source_template' so it fits 'target_template'.
+    Token diff of the two templates:
+      * replaced placeholders are renamed in the meaning (<USER> -> <USERNAME>)
+      * inserted words / placeholders are appended, e.g. " (by (uid=<UID>))"
+      * a removed word or placeholder can't be taken out of the prose -> None
+      * punctuation-only changes are ignored
+    Returns the adapted meaning, or None when it can't be adapted safely.
+    """
+    source = tokenize_template(source_template)
+    target = tokenize_template(target_template)
+    renames = {}
+    appended = []
+
+    matcher = SequenceMatcher(None, [t for t, _, _ in source], [t for t, _, _ in target], autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        if any(_is_word(t) for t, _, _ in source[i1:i2]):
+            return None # The meaning may describe that word ("opened" vs "closed")
+        removed = [t for t, _, _ in source[i1:i2] if PLACEHOLDER_PATTERN.fullmatch(t)]
+        added = [t for t, _, _ in target[j1:j2] if PLACEHOLDER_PATTERN.fullmatch(t)]
+        if len(removed) > len(added):
+            return None
+        for old, new in zip(removed, added):
+            if renames.setdefault(old, new) != new:
+                return None # Same placeholder would need two different names
+        if len(added) > len(removed) or any(_is_word(t) for t, _, _ in target[j1:j2]):
+            appended.append(target_template[target[j1][1]:target[j2 - 1][2]])
+
+    adapted = PLACEHOLDER_PATTERN.sub(lambda m: renames.get(m.group(), m.group()), meaning)
+    if appended:
+        adapted = f"{adapted.rstrip().rstrip('.')} ({'; '.join(appended)})."
+
+    # Every target placeholder kept, and nothing the merge step couldn't fill
+    extra = set(PLACEHOLDER_PATTERN.findall(adapted)) - set(PLACEHOLDER_PATTERN.findall(target_template))
+    if extra or not keeps_placeholders(target_template, adapted):
+        return None
+    return adapted
+
+
+class SimilarityIndex:
+    """
+    Cached (template, meaning) pairs bucketed by program, compared by token-set
+    Jaccard. best_match() returns (source_template, score, adapted_meaning) or None.
+    """
+    def __init__(self, entries, threshold):
+        self.threshold = threshold
+        self.buckets = defaultdict(list)
+        for template, meaning in entries:
+            tokens = tokenize_template(template)
+            self.buckets[program_of(tokens)].append((template, meaning, {t for t, _, _ in tokens}))
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def best_match(self, template):
+        tokens = tokenize_template(template)
+        token_set = {t for t, _, _ in tokens}
+        scored = []
+        for source, meaning, source_set in self.buckets.get(program_of(tokens), ()):
+            score = jaccard(token_set, source_set)
+            if score >= self.threshold and source != template:
+                scored.append((score, source, meaning))
+
+        # Best score first; fall back to the next candidate if adaptation fails
+        for score, source, meaning in sorted(scored, key=lambda s: -s[0]):
+            adapted = adapt_meaning(source, meaning, template)
+            if adapted is not None:
+                return source, score, adapted
+        return None
@@ -2,7 +2,6 @@ import justpy as jp
 import os
 import sys
 import base64
-import pandas as pd
 import asyncio
 import time
 
@@ -10,22 +9,28 @@ import time
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'code'))
 
 # Import your tools
-from cleaner import clean_log_file, BASE_BLACKLIST, find_new_processes
-from parser import parse_log_file 
+from cleaner import clean_log_file, BASE_BLACKLIST, find_new_processes, scan_log_file
+from parser import parse_log_file, STREAM_MIN_BYTES
 #from meaning_generator import generate_meanings_for_file
-from llama_meaning_generator import generate_meanings_for_file
+from llama_meaning_generator import generate_meanings_for_file, start_background_warmup
 from report_engine import step_1_merge_sentences, step_2_sort_logs, step_3_generate_report
+from artifact_store import read_sheet
 from image_handler import get_b64_image, setup_lightbox
 from markdown_handler import render_markdown_report, render_markdown_text
 from ai_assistant import generate_summary, chat_with_log
 
+# LOGSUMMARY_EXCEL=1 also exports the final sorted table as .xlsx (openpyxl is slow on big files)
+EXPORT_EXCEL = os.environ.get("LOGSUMMARY_EXCEL", "").strip().lower() in ("1", "true", "yes")
+
 # 2. STATE MANAGEMENT
 class PipelineState:
     def __init__(self):
         self.cleaned_file_path = None
         self.uploaded_file = None
+        self.parsed_file_path = None
         self.meaning_file_path = None
         self.custom_blacklist = set()
+        self.process_scan = None # Histogram from scan_log_file (shared by Scan + Clean)
         self.active_blacklist=[]
         self.chat_history = []
 
@@ -64,9 +69,36 @@ def create_active_accordion(parent, title, items):
             
     header.on('click', toggle)
     # Store the fill function on the wrapper so we can call it later
-    wrapper.refresh_list = fill_items 
+    wrapper.refresh_list = fill_items
     return wrapper
 
+# 3b. HELPER: Parse Timing Panel (Step 2)
+def render_parse_stats(stats, parent, growth_points=8):
+    """Per-phase time bars, throughput and template growth from parse_log_file's stats."""
+    box = jp.Div(a=parent, classes="border rounded shadow-sm bg-white p-3 mb-4 text-xs text-gray-700")
+    jp.Div(text=f"⏱ Parse timing: {stats['lines']:,} lines in {stats['seconds']:.2f}s "
+                f"({stats['lines_per_sec']:,.0f} lines/s, mode: {stats['mode']})",
+           a=box, classes="font-bold text-slate-700 text-sm mb-2")
+
+    # Phase bars (share of the wall time)
+    total = sum(stats['phases'].values()) or 1.0
+    for phase, seconds in stats['phases'].items():
+        row = jp.Div(a=box, classes="flex items-center gap-2 mb-1")
+        jp.Span(text=phase, a=row, classes="w-24 font-mono")
+        track = jp.Div(a=row, classes="flex-1 bg-gray-100 rounded h-3 overflow-hidden")
+        jp.Div(a=track, classes="bg-blue-500 h-3", style=f"width: {100 * seconds / total:.1f}%")
+        jp.Span(text=f"{seconds:.2f}s", a=row, classes="w-16 text-right font-mono")
+
+    # Template growth (a few evenly spaced samples)
+    growth = stats.get('template_growth') or []
+    if growth:
+        step = max(1, len(growth) // growth_points)
+        points = growth[::step]
+        if points[-1] is not growth[-1]:
+            points.append(growth[-1])
+        text = "  →  ".join(f"{p['lines']:,}: {p['templates']}" for p in points)
+        jp.Div(text=f"Templates by lines read: {text}", a=box, classes="mt-2 font-mono text-gray-500 break-words")
+
 # 4. MAIN APPLICATION
 def app():
     
@@ -270,6 +302,7 @@ def app():
                     
                     # SUCCESS UI UPDATES
                     msg.page.state.uploaded_file = save_path
+                    msg.page.state.process_scan = None # New file -> old histogram is stale
                     upload_status.inner_html = f"✅ <i>Saved: {fname} ({line_count} lines)</i>"
                     upload_status.classes = "text-xs text-green-600 mt-2 mb-4"
                     
@@ -322,8 +355,12 @@ def app():
             suggestions_box.classes = "italic text-red-600 text-xs mt-3 block"
             return
 
-        # 2. Run Scan
-        new_items = find_new_processes(msg.page.state.uploaded_file)
+        # 2. Run Scan (one read builds the histogram; CLEAN reuses it later)
+        scan = scan_log_file(msg.page.state.uploaded_file)
+        msg.page.state.process_scan = scan
+        new_items = find_new_processes(msg.page.state.uploaded_file, scan=scan)
+        # Noisiest daemons first
+        new_items.sort(key=lambda name: scan[name]["count"], reverse=True)
         
         # 3. Reset UI
         suggestions_box.delete_components()
@@ -342,10 +379,12 @@ def app():
             btn_add_blacklist.classes = btn_add_blacklist.classes.replace("hidden", "block") # Show button
             
             for item in new_items:
-                # Create interactive div
-                d = jp.Div(text=item, a=suggestions_box, 
+                stats = scan[item]
+                # Create interactive div (shows the line count for the process)
+                d = jp.Div(text=f"{item} ({stats['count']})", a=suggestions_box, 
                        classes="bg-white border border-gray-300 px-2 py-1 rounded cursor-pointer hover:bg-blue-50 text-center truncate transition-colors",
-                       title="Click to select")
+                       title=f"{stats['count']} lines (first: line {stats['first_line']}, last: line {stats['last_line']}). Click to select")
+                d.process_name = item
                 d.on('click', toggle_blacklist_item) # <--- Connect the toggle event
         else:
             suggestions_box.text = "No new processes found."
@@ -354,7 +393,7 @@ def app():
 
     # Logic: Toggle item selection (White <-> Green)
     def toggle_blacklist_item(self, msg):
-        process_name = self.text
+        process_name = self.process_name
         
         # Check if already selected
         if process_name in msg.page.state.custom_blacklist:
@@ -429,9 +468,16 @@ def app():
         file_path = msg.page.state.uploaded_file
         
         # Run the cleaner with the active blacklist
+        # (large files are split across all cores; small ones stay serial;
+        #  a re-uploaded file that only grew is cleaned from its checkpoint;
+        #  plain files use the bytes-level mmap fast path)
         out, trash, kept, removed = clean_log_file(
             file_path, 
-            extra_blacklist=msg.page.state.active_blacklist
+            extra_blacklist=msg.page.state.active_blacklist,
+            workers=os.cpu_count(),
+            scan=msg.page.state.process_scan,
+            resume=True,
+            fast=True
         ) 
         
         msg.page.state.cleaned_file_path = out
@@ -538,7 +584,14 @@ def app():
         
         try:
             # 2. RUN THE PARSER
-            excel_path, total_lines, clusters = parse_log_file(cleaned_file)
+            # (mine first, then extract against the final templates on all cores;
+            #  the persistent miner keeps Template IDs stable across uploads;
+            #  huge inputs are streamed to disk in batches instead)
+            excel_path, total_lines, clusters, parse_stats = parse_log_file(
+                cleaned_file, resume=True, two_phase=True, workers=os.cpu_count(),
+                persist_state=True, stream=os.path.getsize(cleaned_file) >= STREAM_MIN_BYTES
+            )
+            msg.page.state.parsed_file_path = excel_path
             # 3. SHOW RESULTS
             card2.delete_components()
             jp.Div(text="Step 2: Parsing", a=card2, classes="text-xl font-bold mb-4 text-slate-800 border-b pb-2")
@@ -555,11 +608,15 @@ def app():
             
             # ---Output File (Blue Italic outside box) ---
             jp.Div(text=f"(Output File: {os.path.basename(excel_path)})", a=card2, classes="text-xs text-blue-600 italic mb-4")
+
+            # --- Parse timing (same numbers as the _analysis.stats.json sidecar) ---
+            if parse_stats:
+                render_parse_stats(parse_stats, card2)
             # ========================================================
             # NEW: COLLAPSIBLE TEMPLATE SUMMARY (SHEET 2 DISPLAY)
             # ========================================================
-            # 1. Read Sheet 2 from the Excel file we just created
-            df = pd.read_excel(excel_path, sheet_name='Template Summary')
+            # 1. Read Sheet 2 from the artifact we just created
+            df = read_sheet(excel_path, 'Template Summary')
             # 2. Wrapper Container
             summary_wrap = jp.Div(a=card2, classes="border rounded shadow-sm bg-white mt-4 overflow-hidden")
             # 3. Header (Click to Toggle)
@@ -659,12 +716,10 @@ def app():
         # This runs in the browser, so it won't freeze when Python gets busy
         start_time_py = time.time()
         
-        # Get paths
-        cleaned_file = msg.page.state.cleaned_file_path
-        base_name, _ = os.path.splitext(cleaned_file)
-        parsed_excel_path = f"{base_name}_analysis.xlsx"
+        # Get paths (set by the parser step)
+        parsed_excel_path = msg.page.state.parsed_file_path
         
-        if not os.path.exists(parsed_excel_path):
+        if not parsed_excel_path or not os.path.exists(parsed_excel_path):
             print(f"[ERROR] Parsed file not found: {parsed_excel_path}")
             self.inner_html = ""
             self.text = "❌ Error: Input file missing"
@@ -675,7 +730,7 @@ def app():
 
         try:
             # 2. RUN GENERATOR
-            meaning_excel_path, count = await asyncio.to_thread(generate_meanings_for_file, parsed_excel_path)
+            meaning_excel_path, count, meaning_job = await asyncio.to_thread(generate_meanings_for_file, parsed_excel_path)
             
             # --- STOP CLIENT TIMER ---
             # Calculate final static time for the report
@@ -703,7 +758,12 @@ def app():
             <div class="ml-4">
                 • <b>Time Taken:</b> {total_duration}<br>
                 • <b>Templates Processed:</b> {count}<br>
-                • <b>Model:</b> meta-llama/Llama-3.1-8B
+                • <b>Generated Now:</b> {meaning_job['generated']} (From Cache: {meaning_job['cached']}, Rule Engine: {meaning_job['ruled']})<br>
+                {f"• <b>Resumed:</b> {meaning_job['resumed']} meanings saved by an interrupted run<br>" if meaning_job['resumed'] else ""}
+                {f"• <b>Reused:</b> {meaning_job['reused']} meanings of similar templates (see the _reuse.csv audit list)<br>" if meaning_job['reused'] else ""}
+                {f"• <b>Failed:</b> {meaning_job['failed']} templates (shown as-is; run again to retry them)<br>" if meaning_job['failed'] else ""}
+                {f"• <b>Offline Fallback:</b> {meaning_job['fallback']} templates without a rule<br>" if meaning_job['fallback'] else ""}
+                • <b>Model:</b> {"Rule engine (offline)" if meaning_job['offline'] else "meta-llama/Llama-3.1-8B"}
             </div>
             """
             
@@ -711,7 +771,7 @@ def app():
             jp.Div(text=f"(Output File: {os.path.basename(meaning_excel_path)})", a=card3, classes="text-xs text-blue-600 italic mb-4")
 
             # 4. COLLAPSIBLE TABLE
-            df = pd.read_excel(meaning_excel_path, sheet_name='Template Summary')
+            df = read_sheet(meaning_excel_path, 'Template Summary')
             df = df.sort_values(by="Template ID")
             
             summary_wrap = jp.Div(a=card3, classes="border rounded shadow-sm bg-white mt-4 overflow-hidden")
@@ -829,7 +889,8 @@ def app():
             file_merged = await asyncio.to_thread(step_1_merge_sentences, input_file)
             
             # --- 2. SORT ---
-            file_sorted = await asyncio.to_thread(step_2_sort_logs, file_merged)
+            # (Excel export of the final sorted table only when LOGSUMMARY_EXCEL=1)
+            file_sorted = await asyncio.to_thread(step_2_sort_logs, file_merged, EXPORT_EXCEL)
             
             # --- 3. REPORT ---
             report_path = await asyncio.to_thread(step_3_generate_report, file_sorted)
@@ -1240,4 +1301,9 @@ def app():
     # (And ignores clicks outside the box!)
     input_box.on('submit', handle_chat_message)             
     return wp
-jp.justpy(app, port=8000, reload=False)
\ No newline at end of file
+
+# Guarded so worker processes (parallel cleaning) don't start a second server
+if __name__ == "__main__":
+    # Ollama health check + model pre-load run while the server starts
+    start_background_warmup()
+    jp.justpy(app, port=8000, reload=False)
\ No newline at end of file
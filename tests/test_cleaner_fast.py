@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from cleaner import clean_log_file
+
+KEYWORDS = ["ftpd[", "su(pam_unix)", "a.b", "x+", "sshd", "ss", "", "two words", "kernél"]
+TOKENS = ["sshd[12]:", "ssh", "ftpd[3]:", "ftpd:", "su(pam_unix)[9]:", "a.b", "axb", "x+1", "xx", "kernel:", "-"]
+SPACES = [" ", "  ", "\t", " \x0b", "\x0c "]
+
+
+def _random_log(rng, lines):
+    out = []
+    for _ in range(lines):
+        kind = rng.random()
+        if kind < 0.1:
+            out.append(rng.choice(["", " ", "\t \x0c"]))
+        elif kind < 0.2:
+            out.append(" ".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 4))))
+        else:
+            head = ["Jun", str(rng.randint(1, 30)), "04:0%d:00" % rng.randint(0, 9), "combo", rng.choice(TOKENS)]
+            rest = [rng.choice(TOKENS) for _ in range(rng.randint(0, 3))]
+            lead = rng.choice(["", "", " "])
+            out.append(lead + "".join(t + rng.choice(SPACES) for t in head + rest).rstrip(rng.choice(["", " "])))
+    return "\n".join(out) + rng.choice(["", "\n"])
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_path_matches_text_path(tmp_path, seed):
+    log_file = tmp_path / "random.log"
+    log_file.write_bytes(_random_log(random.Random(seed), 500).encode("ascii"))
+
+    text = clean_log_file(str(log_file), extra_blacklist=KEYWORDS)
+    expected = [_read(text[0]), _read(text[1]), text[2:]]
+    fast = clean_log_file(str(log_file), extra_blacklist=KEYWORDS, fast=True)
+    assert [_read(fast[0]), _read(fast[1]), fast[2:]] == expected
+
+
+def test_parallel_fast_path_keeps_raw_bytes(tmp_path, monkeypatch):
+    import cleaner
+    # Several chunks, and a byte that isn't valid UTF-8 (parts must be stitched undecoded)
+    monkeypatch.setattr(cleaner, "CHUNK_BYTES", 4096)
+    text = _random_log(random.Random(7), 600).encode("ascii")
+    log_file = tmp_path / "latin1.log"
+    log_file.write_bytes(text.replace(b"combo", b"caf\xe9", 40))
+
+    serial = clean_log_file(str(log_file), extra_blacklist=KEYWORDS, fast=True)
+    expected = [_read(serial[0]), _read(serial[1]), serial[2:]]
+    parallel = clean_log_file(str(log_file), extra_blacklist=KEYWORDS, fast=True, workers=2)
+    assert parallel is not None
+    assert [_read(parallel[0]), _read(parallel[1]), parallel[2:]] == expected
@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import SAMPLE_LOG
+from cleaner import clean_log_file
+from log_io import open_log
+
+
+def _lines(path):
+    with open_log(path, "r") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("compress_output", [None, "gz", "zst"])
+def test_resume_appends_to_compressed_outputs(tmp_path, compress_output):
+    with open(SAMPLE_LOG, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    log_file = tmp_path / "growing.log"
+    log_file.write_bytes(b"".join(lines[:1000]))
+    clean_log_file(str(log_file), compress_output=compress_output, resume=True)
+
+    log_file.write_bytes(b"".join(lines[:1500]))
+    resumed = clean_log_file(str(log_file), compress_output=compress_output, resume=True)
+
+    full_file = tmp_path / "full.log"
+    full_file.write_bytes(b"".join(lines[:1500]))
+    full = clean_log_file(str(full_file), compress_output=compress_output)
+    assert resumed[2:] == full[2:]
+    assert _lines(resumed[0]) == _lines(full[0])
+    assert _lines(resumed[1]) == _lines(full[1])
+
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("first_resume", [True, False])
+def test_partial_last_line_is_not_split(tmp_path, fast, first_resume):
+    with open(SAMPLE_LOG, "rb") as f:
+        lines = f.read().splitlines(keepends=True)[:20]
+    full_file = tmp_path / "full.log"
+    full_file.write_bytes(b"".join(lines))
+    full = clean_log_file(str(full_file), fast=fast)
+
+    # Writer is halfway through line 20; a resumable run leaves it for later
+    log_file = tmp_path / "growing.log"
+    log_file.write_bytes(b"".join(lines[:19]) + lines[19][:30])
+    first = clean_log_file(str(log_file), resume=first_resume, fast=fast)
+    assert sum(first[2:]) == (19 if first_resume else 20)
+
+    log_file.write_bytes(b"".join(lines))
+    resumed = clean_log_file(str(log_file), resume=True, fast=fast)
+    assert resumed[2:] == full[2:]
+    assert _lines(resumed[0]) == _lines(full[0])
+    assert _lines(resumed[1]) == _lines(full[1])
@@ -0,0 +1,24 @@
+import shutil
+
+import pytest
+
+from conftest import SAMPLE_LOG
+from cleaner import clean_log_file, scan_log_file
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("extra", [None, ["ftpd["], ["ftpd[", "su(pam_unix)", "sshd", "xinetd[2"]])
+def test_scan_gives_same_output(tmp_path, extra, fast):
+    log_file = str(tmp_path / "sample.log")
+    shutil.copy(SAMPLE_LOG, log_file)
+
+    plain = clean_log_file(log_file, extra_blacklist=extra, fast=fast)
+    expected = [_read(plain[0]), _read(plain[1]), plain[2:]]
+
+    scanned = clean_log_file(log_file, extra_blacklist=extra, fast=fast, scan=scan_log_file(log_file))
+    assert [_read(scanned[0]), _read(scanned[1]), scanned[2:]] == expected
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from bench_masking import compare_chains, load_cleaned_lines, make_maskers
+
+
+@pytest.mark.parametrize("name", ["Linux_2k.log", "Linux_20k.log"])
+def test_fused_masker_matches_drain3_log_masker(tmp_path, name):
+    lines = load_cleaned_lines(name, str(tmp_path))
+    legacy_masker, fused_masker = make_maskers()
+    expected, actual, mismatches = compare_chains(lines, legacy_masker, fused_masker)
+    assert lines and len(actual) == len(expected) == len(lines)
+    assert not mismatches, f"line {mismatches[0]}: {expected[mismatches[0]]} != {actual[mismatches[0]]}"
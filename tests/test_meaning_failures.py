@@ -0,0 +1,59 @@
+import os
+import sys
+import shutil
+import sqlite3
+
+from conftest import ROOT, SAMPLE_LOG
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from stub_ollama import start_stub_server, stub_meaning, DEFAULT_PORT
+
+# The ollama module builds its client from OLLAMA_HOST at import time
+PORT = DEFAULT_PORT + 1
+os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{PORT}"
+
+import llama_meaning_generator
+from cleaner import clean_log_file
+from parser import parse_log_file
+from artifact_store import read_sheet
+
+
+def _job_status(db):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT status, done, total FROM jobs").fetchone()
+
+
+def test_failed_calls_are_not_cached(tmp_path, monkeypatch):
+    log_file = str(tmp_path / "sample.log")
+    shutil.copy(SAMPLE_LOG, log_file)
+    parsed = parse_log_file(clean_log_file(log_file)[0])[0]
+    db = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(llama_meaning_generator, "CACHE_DB", db)
+    monkeypatch.setattr(llama_meaning_generator, "CACHE_FILE", str(tmp_path / "none.json"))
+    monkeypatch.setattr(llama_meaning_generator, "RULES_ENABLED", False)
+    monkeypatch.setattr(llama_meaning_generator, "REUSE_THRESHOLD", 0)
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("Failed to connect to Ollama")
+
+    server = start_stub_server(PORT, latency=0.0)
+    try:
+        # Every call fails (Ollama went away after the health check)
+        with monkeypatch.context() as m:
+            m.setattr(llama_meaning_generator, "_chat", unreachable)
+            output, count, job = llama_meaning_generator.generate_meanings_for_file(parsed)
+        summary = read_sheet(output, 'Template Summary')
+        templates = [str(t).strip() for t in summary['Template Pattern']]
+        assert job["failed"] == count and job["generated"] == 0
+        assert summary['Event Meaning'].tolist() == templates # Display fallback only
+        assert _job_status(db) == ("interrupted", 0, count)
+
+        # The next run asks for every template again and completes the job
+        output, count, job = llama_meaning_generator.generate_meanings_for_file(parsed)
+    finally:
+        server.shutdown()
+        server.server_close()
+    summary = read_sheet(output, 'Template Summary')
+    assert job["failed"] == 0 and job["generated"] == count and job["cached"] == 0
+    assert summary['Event Meaning'].tolist() == [stub_meaning(t).replace('"', '') for t in templates]
+    assert _job_status(db) == ("complete", count, count)
@@ -0,0 +1,70 @@
+import gzip
+import os
+import shutil
+
+from conftest import SAMPLE_LOG
+from artifact_store import read_sheet
+from log_io import checkpoint_path
+from parser import parse_log_file
+
+
+def _sorted_rows(artifact):
+    return read_sheet(artifact, 'Log Analysis').sort_values('Line Index').reset_index(drop=True)
+
+
+def test_resume_gz_input_without_checkpoint(tmp_path):
+    """A .gz input never gets a checkpoint sidecar; resuming must fall back to a full pass."""
+    log_file = tmp_path / "sample.log.gz"
+    with open(SAMPLE_LOG, 'rb') as src, gzip.open(log_file, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+
+    first, rows, _, _ = parse_log_file(str(log_file), resume=True)
+    again, rows_again, _, _ = parse_log_file(str(log_file), resume=True)
+    assert rows_again == rows
+    assert _sorted_rows(again).equals(_sorted_rows(first))
+
+
+def test_resume_with_deleted_checkpoint(tmp_path):
+    """Artifact present but the sidecar deleted: full pass, same output."""
+    log_file = tmp_path / "sample.log"
+    shutil.copy(SAMPLE_LOG, log_file)
+
+    first, rows, _, _ = parse_log_file(str(log_file), resume=True)
+    ckpt = checkpoint_path(os.path.join(str(tmp_path), "sample_analysis"))
+    if os.path.exists(ckpt):
+        os.remove(ckpt)
+    again, rows_again, _, _ = parse_log_file(str(log_file), resume=True)
+    assert rows_again == rows
+    assert _sorted_rows(again).equals(_sorted_rows(first))
+
+
+def test_resume_leaves_a_partial_last_line_for_the_next_run(tmp_path):
+    with open(SAMPLE_LOG, "rb") as f:
+        lines = f.read().splitlines(keepends=True)[:200]
+    log_file = tmp_path / "growing.log"
+    log_file.write_bytes(b"".join(lines[:199]) + lines[199][:30])
+    assert parse_log_file(str(log_file), resume=True)[1] == 199
+
+    log_file.write_bytes(b"".join(lines))
+    output, rows = parse_log_file(str(log_file), resume=True)[:2]
+    raw = _sorted_rows(output)["Raw Log"].tolist()
+    assert rows == 200 and raw == [line.decode().strip() for line in lines]
+
+
+def test_resumed_upload_keeps_other_uploads_template_ids(tmp_path):
+    """Parse A, then B, grow A and resume it: re-parsing B's content gives B's IDs again."""
+    with open(os.path.join(os.path.dirname(SAMPLE_LOG), 'Linux_20k.log'), 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    state_file = str(tmp_path / "drain3_state.bin")
+    parse = lambda path, resume: parse_log_file(str(path), resume=resume, two_phase=True,
+                                                persist_state=True, state_file=state_file)[0]
+    a_file, b_file, b_again = tmp_path / "a.log", tmp_path / "b.log", tmp_path / "b_again.log"
+    a_file.write_bytes(b"".join(lines[:1000]))
+    b_file.write_bytes(b"".join(lines[12000:14000]))
+    b_again.write_bytes(b_file.read_bytes())
+
+    parse(a_file, True)
+    first_b = _sorted_rows(parse(b_file, True))["Template ID"].tolist()
+    a_file.write_bytes(b"".join(lines[:1500]))
+    parse(a_file, True)
+    assert _sorted_rows(parse(b_again, True))["Template ID"].tolist() == first_b